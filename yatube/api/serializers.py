@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from posts.thumbnails import image_storage, url_key
+
+# Поле ответа и колонки queryset.values(), из которых оно собирается.
+POST_FIELDS = {
+    'id': ('id',),
+    'text': ('text',),
+    'pub_date': ('pub_date',),
+    'comments_count': ('comments_count',),
+    'image': ('image',),
+    'author': (
+        'author_id', 'author__username', 'author__first_name',
+        'author__last_name',
+    ),
+    'group': ('group_id', 'group__slug', 'group__title'),
+}
+COMMENT_FIELDS = {
+    'id': ('id',),
+    'text': ('text',),
+    'created': ('created',),
+    'author': (
+        'author_id', 'author__username', 'author__first_name',
+        'author__last_name',
+    ),
+}
+
+
+class FieldError(ValueError):
+    pass
+
+
+def parse_fields(value, known):
+    """Поля из параметра fields=a,b; без параметра — все поля."""
+    if not value:
+        return list(known)
+    fields = [field for field in value.split(',') if field]
+    unknown = sorted(set(fields) - set(known))
+    if unknown:
+        raise FieldError(f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def columns(fields, known, prefix=''):
+    return [
+        prefix + column for field in fields for column in known[field]
+    ]
+
+
+def author_object(row, prefix):
+    return {
+        'id': row[f'{prefix}author_id'],
+        'username': row[f'{prefix}author__username'],
+        'full_name': ' '.join(filter(None, (
+            row[f'{prefix}author__first_name'],
+            row[f'{prefix}author__last_name'],
+        ))),
+    }
+
+
+def image_urls(names):
+    """Адреса картинок и их готовых миниатюр одним обращением к кэшу.
+
+    Миниатюры, которые ещё не созданы, отдаются как null.
+    """
+    renditions = list(settings.POST_THUMBNAILS)
+    cached = cache.get_many([
+        url_key(name, rendition) for name in names for rendition in renditions
+    ])
+    storage = image_storage()
+    return {
+        name: {
+            'url': storage.url(name),
+            'thumbnails': {
+                rendition: cached.get(url_key(name, rendition))
+                for rendition in renditions
+            },
+        }
+        for name in names
+    }
+
+
+def serialize_posts(rows, fields, prefix=''):
+    """Собирает посты из строк values() без создания моделей.
+
+    prefix — путь к посту от модели queryset, например post__
+    для ленты подписок.
+    """
+    images = {}
+    if 'image' in fields:
+        images = image_urls(
+            {row[f'{prefix}image'] for row in rows if row[f'{prefix}image']}
+        )
+    plain = [
+        field for field in fields if field not in ('author', 'group', 'image')
+    ]
+    result = []
+    for row in rows:
+        item = {field: row[prefix + field] for field in plain}
+        if 'author' in fields:
+            item['author'] = author_object(row, prefix)
+        if 'group' in fields:
+            group_id = row[f'{prefix}group_id']
+            item['group'] = group_id and {
+                'id': group_id,
+                'slug': row[f'{prefix}group__slug'],
+                'title': row[f'{prefix}group__title'],
+            }
+        if 'image' in fields:
+            item['image'] = images.get(row[f'{prefix}image'])
+        result.append(item)
+    return result
+
+
+def serialize_comments(rows, fields):
+    result = []
+    for row in rows:
+        item = {
+            field: row[field] for field in fields if field != 'author'
+        }
+        if 'author' in fields:
+            item['author'] = author_object(row, '')
+        result.append(item)
+    return result
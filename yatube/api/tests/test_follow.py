@@ -0,0 +1,141 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.follows import FOLLOW_ATTEMPTS, follow_authors, get_following
+from posts.models import Follow, Post, Timeline, UserCounter
+
+User = get_user_model()
+
+
+class BatchFollowTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authors = [
+            User.objects.create_user(username=f'Author{i}') for i in range(3)
+        ]
+        for author in cls.authors:
+            Post.objects.create(text='Пост', author=author)
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def counter(self, user):
+        return UserCounter.objects.get(user=user)
+
+    def post(self, name, usernames):
+        return self.reader_client.post(
+            reverse(f'api:{name}'),
+            json.dumps({'usernames': usernames}),
+            content_type='application/json'
+        )
+
+    def test_follow_many(self):
+        """Подписка на список авторов создаёт подписки, ленту и счётчики"""
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        response = self.post(
+            'follow', ['Author0', 'Author1', 'Author2', 'Nobody', 'Reader']
+        )
+        self.assertEqual(response.json(), {
+            'changed': ['Author1', 'Author2'],
+            'not_found': ['Nobody'],
+        })
+        self.assertEqual(
+            get_following(self.reader.id),
+            {author.id for author in self.authors}
+        )
+        self.assertEqual(Timeline.objects.filter(user=self.reader).count(), 3)
+        self.assertEqual(self.counter(self.reader).following, 3)
+        self.assertEqual(self.counter(self.authors[1]).followers, 1)
+
+    def test_unfollow_many(self):
+        """Отписка от списка авторов убирает подписки и посты из ленты"""
+        self.post('follow', ['Author0', 'Author1', 'Author2'])
+        get_following(self.reader.id)
+        response = self.post('unfollow', ['Author0', 'Author1'])
+        self.assertEqual(response.json()['changed'], ['Author0', 'Author1'])
+        self.assertEqual(get_following(self.reader.id), {self.authors[2].id})
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader).count(), 1
+        )
+        self.assertEqual(Timeline.objects.filter(user=self.reader).count(), 1)
+        self.assertEqual(self.counter(self.reader).following, 1)
+        self.assertEqual(self.counter(self.authors[0]).followers, 0)
+
+    def test_concurrent_follow(self):
+        """Подписка из параллельного запроса не считается дважды"""
+        Follow.objects.create(user=self.reader, author=self.authors[1])
+        queryset = Follow.objects.get_queryset()
+        checks = []
+
+        def filter_follows(*args, **kwargs):
+            # Первая проверка не видит подписку: её будто бы записал
+            # параллельный запрос сразу после проверки.
+            checks.append(kwargs)
+            if len(checks) == 1:
+                return queryset.none()
+            return queryset.filter(*args, **kwargs)
+
+        with mock.patch.object(Follow.objects, 'filter', filter_follows):
+            response = self.post('follow', ['Author0', 'Author1'])
+        self.assertEqual(response.json()['changed'], ['Author0'])
+        self.assertEqual(len(checks), 2)
+        self.assertEqual(self.counter(self.reader).following, 2)
+        self.assertEqual(self.counter(self.authors[1]).followers, 1)
+
+    def test_follow_attempts_limited(self):
+        """Постоянная ошибка вставки не повторяется бесконечно"""
+        with mock.patch.object(
+            Follow.objects, 'bulk_create', side_effect=IntegrityError
+        ) as bulk_create:
+            with self.assertRaises(IntegrityError):
+                follow_authors(self.reader, [self.authors[0].id])
+        self.assertEqual(bulk_create.call_count, FOLLOW_ATTEMPTS)
+        self.assertFalse(Follow.objects.filter(user=self.reader).exists())
+
+    def test_constant_queries(self):
+        """Число запросов не зависит от длины списка"""
+        with self.assertNumQueries(11):
+            self.post('follow', ['Author0'])
+        self.post('unfollow', ['Author0'])
+        with self.assertNumQueries(11):
+            self.post('follow', ['Author0', 'Author1', 'Author2'])
+
+    def test_status(self):
+        """Статус подписки на пачку авторов одним запросом к базе"""
+        Follow.objects.create(user=self.reader, author=self.authors[1])
+        get_following(self.reader.id)
+        url = reverse('api:follow_status')
+        self.reader_client.get(url)
+        with self.assertNumQueries(3):
+            response = self.reader_client.get(
+                url, {'usernames': 'Author0,Author1,Nobody'}
+            )
+        self.assertEqual(response.json(), {'Author0': False, 'Author1': True})
+
+    @override_settings(FOLLOW_BATCH_LIMIT=2)
+    def test_errors(self):
+        """Неверный список и анонимный пользователь получают ошибку"""
+        cases = [
+            ['Author0', 'Author1', 'Author2'],
+            'Author0',
+            [1, 2],
+        ]
+        for usernames in cases:
+            with self.subTest(usernames=usernames):
+                self.assertEqual(
+                    self.post('follow', usernames).status_code, 400
+                )
+        response = Client().post(reverse('api:follow'))
+        self.assertEqual(response.status_code, 401)
+        response = self.reader_client.get(reverse('api:follow'))
+        self.assertEqual(response.status_code, 405)
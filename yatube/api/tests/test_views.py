@@ -0,0 +1,194 @@
+import warnings
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import CacheKeyWarning, cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.thumbnails import url_key
+
+User = get_user_model()
+
+
+@override_settings(POST_PER_PAGE=2)
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='Author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+            for i in range(3)
+        ]
+        cls.plain = Post.objects.create(text='Без группы', author=cls.reader)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def ids(self, response):
+        return [item['id'] for item in response.json()['results']]
+
+    def test_feeds(self):
+        """Ленты отдают те же посты, что и страницы сайта"""
+        newest = [post.id for post in self.posts[::-1]]
+        urls = {
+            reverse('api:posts'): [self.plain.id] + newest[:1],
+            reverse('api:group_posts', args=[self.group.slug]): newest[:2],
+            reverse('api:user_posts', args=['Author']): newest[:2],
+            reverse('api:follow_posts'): newest[:2],
+        }
+        for url, expected in urls.items():
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.ids(response), expected)
+
+    def test_cursor_pagination(self):
+        """Ссылки next и previous листают ленту без повторов"""
+        url = reverse('api:user_posts', args=['Author'])
+        first = self.reader_client.get(url).json()
+        self.assertIsNone(first['previous'])
+        second = self.reader_client.get(first['next']).json()
+        self.assertEqual(
+            [item['id'] for item in second['results']], [self.posts[0].id]
+        )
+        self.assertIsNone(second['next'])
+        back = self.reader_client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_embedded_objects(self):
+        """Автор и группа встроены в пост, картинки без файла — null"""
+        response = self.reader_client.get(
+            reverse('api:post', args=[self.posts[0].id])
+        )
+        item = response.json()
+        self.assertEqual(item['author'], {
+            'id': self.author.id,
+            'username': 'Author',
+            'full_name': 'Лев Толстой',
+        })
+        self.assertEqual(item['group'], {
+            'id': self.group.id,
+            'slug': 'test-slug',
+            'title': 'Тестовая группа',
+        })
+        self.assertEqual(item['comments_count'], 1)
+        self.assertIsNone(item['image'])
+        plain = self.reader_client.get(
+            reverse('api:post', args=[self.plain.id])
+        ).json()
+        self.assertIsNone(plain['group'])
+
+    def test_thumbnail_urls_from_cache(self):
+        """Адреса миниатюр берутся из кэша, ещё не созданные — null"""
+        Post.objects.filter(id=self.plain.id).update(image='posts/a.gif')
+        cache.set(url_key('posts/a.gif', 'card'), '/media/cache/a.gif')
+        item = self.reader_client.get(
+            reverse('api:post', args=[self.plain.id])
+        ).json()
+        self.assertEqual(item['image'], {
+            'url': settings.MEDIA_URL + 'posts/a.gif',
+            'thumbnails': {'card': '/media/cache/a.gif'},
+        })
+
+    def test_sparse_fields(self):
+        """fields= оставляет только запрошенные поля"""
+        response = self.reader_client.get(
+            reverse('api:posts'), {'fields': 'id,author'}
+        )
+        for item in response.json()['results']:
+            self.assertEqual(set(item), {'id', 'author'})
+        response = self.reader_client.get(
+            reverse('api:posts'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_comments(self):
+        """Комментарии поста отдаются страницами"""
+        response = self.reader_client.get(
+            reverse('api:post_comments', args=[self.posts[0].id]),
+            {'fields': 'text,author'}
+        )
+        self.assertEqual(response.json()['results'], [{
+            'text': 'Комментарий',
+            'author': {'id': self.reader.id, 'username': 'Reader',
+                       'full_name': ''},
+        }])
+
+    def test_errors(self):
+        """Ошибки отдаются в JSON"""
+        cases = {
+            reverse('api:group_posts', args=['missing']): 404,
+            reverse('api:post', args=[0]): 404,
+            reverse('api:posts') + '?limit=1000': 400,
+        }
+        for url, status in cases.items():
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
+        response = Client().get(reverse('api:follow_posts'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_renamed_user_posts(self):
+        """Лента пользователя в API ищется по текущему имени,
+        в том числе не латинскому"""
+        user = User.objects.create_user(username='Писатель')
+        post = Post.objects.create(text='Пост', author=user)
+        old_url = reverse('api:user_posts', args=[user.username])
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            response = self.reader_client.get(old_url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.ids(response), [post.id])
+            user.username = 'Поэт'
+            user.save()
+            self.assertEqual(self.reader_client.get(old_url).status_code, 404)
+            response = self.reader_client.get(
+                reverse('api:user_posts', args=[user.username])
+            )
+        self.assertEqual(self.ids(response), [post.id])
+
+    def test_cacheable(self):
+        """Повтор отдаётся из кэша, совпадающий ETag — ответом 304"""
+        url = reverse('api:posts')
+        response = self.reader_client.get(url)
+        self.assertIn('max-age', response['Cache-Control'])
+        with self.assertNumQueries(2):
+            cached = self.reader_client.get(url)
+        self.assertEqual(cached.content, response.content)
+        response = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text='Новый', author=self.author)
+        self.assertNotEqual(self.reader_client.get(url)['ETag'],
+                            cached['ETag'])
+
+    def test_query_count_independent_of_page_size(self):
+        """Число запросов не зависит от числа постов на странице"""
+        url = reverse('api:posts')
+        with self.assertNumQueries(3):
+            self.reader_client.get(url, {'limit': 1})
+        cache.clear()
+        with self.assertNumQueries(3):
+            self.reader_client.get(url, {'limit': 4})
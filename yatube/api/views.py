@@ -0,0 +1,268 @@
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                quote_etag)
+from django.views.decorators.http import require_GET, require_POST
+
+from posts import timeline
+from posts.counts import feed_key, reset_feed_counts
+from posts.etags import (find_group_id, find_user_id, group_etag, index_etag,
+                         make_etag, post_etag, profile_etag)
+from posts.follows import follow_authors, get_following, unfollow_authors
+from posts.fragments import bump_generations
+from posts.models import Comment, Post, Timeline, User
+from posts.utils import CursorPaginator
+
+from .serializers import (COMMENT_FIELDS, POST_FIELDS, FieldError, columns,
+                          parse_fields, serialize_comments, serialize_posts)
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def follow_etag(request):
+    # Как и страница ленты, сначала подтягиваем посты популярных
+    # авторов: это меняет поколение ленты и, значит, ETag.
+    count_key = feed_key('follower', request.user.id)
+    if timeline.pull(request.user):
+        reset_feed_counts([count_key])
+        bump_generations([count_key])
+    return make_etag(request, [count_key])
+
+
+def cacheable(etag_func):
+    """Ответ 304 по ETag и готовое тело ответа в кэше под этим ETag.
+
+    ETag складывается из поколений лент, поэтому тело из кэша
+    не устаревает: после записи меняется и ключ.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag = etag_func(request, *args, **kwargs)
+            if etag is None:
+                return error(404, 'Не найдено')
+            etag = quote_etag(etag)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                key = f'api:{request.path}:{etag}'
+                content = cache.get(key)
+                if content is None:
+                    response = view(request, *args, **kwargs)
+                    if response.status_code == 200:
+                        cache.set(key, response.content,
+                                  settings.FEED_CACHE_TIMEOUT)
+                else:
+                    response = HttpResponse(
+                        content, content_type='application/json'
+                    )
+            response['ETag'] = etag
+            patch_cache_control(
+                response, private=True, max_age=settings.API_MAX_AGE
+            )
+            return response
+        return wrapper
+    return decorator
+
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error(401, 'Нужна авторизация')
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def parse_limit(value, default):
+    if not value:
+        return default
+    if not value.isdigit() or not 1 <= int(value) <= settings.API_MAX_LIMIT:
+        raise FieldError(
+            f'limit должен быть числом от 1 до {settings.API_MAX_LIMIT}'
+        )
+    return int(value)
+
+
+def page_link(request, **cursor):
+    params = request.GET.copy()
+    for name in ('before', 'after'):
+        params.pop(name, None)
+    name, value = next(iter(cursor.items()))
+    if value is None:
+        return None
+    params[name] = value
+    return f'{request.path}?{params.urlencode()}'
+
+
+def cursor_page(request, queryset, known, prefix='', cursor_fields=None,
+                per_page=None):
+    """Поля ответа и страница строк values() по курсору."""
+    fields = parse_fields(request.GET.get('fields'), known)
+    limit = parse_limit(
+        request.GET.get('limit'), per_page or settings.POST_PER_PAGE
+    )
+    cursor_fields = cursor_fields or ('pub_date', 'id')
+    rows = queryset.values(*dict.fromkeys(
+        columns(fields, known, prefix) + list(cursor_fields)
+    ))
+    paginator = CursorPaginator(rows, limit, fields=cursor_fields)
+    page = paginator.get_cursor_page(
+        before=request.GET.get('before'), after=request.GET.get('after')
+    )
+    return fields, page
+
+
+def page_response(request, page, results):
+    return JsonResponse({
+        'results': results,
+        'next': page_link(request, before=page.next_cursor),
+        'previous': page_link(request, after=page.previous_cursor),
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+def post_list(request, queryset, prefix=''):
+    try:
+        fields, page = cursor_page(request, queryset, POST_FIELDS, prefix)
+    except FieldError as exc:
+        return error(400, str(exc))
+    return page_response(
+        request, page, serialize_posts(page.object_list, fields, prefix)
+    )
+
+
+@require_GET
+@cacheable(index_etag)
+def posts(request):
+    return post_list(request, Post.objects.all())
+
+
+@require_GET
+@cacheable(group_etag)
+def group_posts(request, slug):
+    return post_list(
+        request, Post.objects.filter(group_id=find_group_id(slug))
+    )
+
+
+@require_GET
+@cacheable(profile_etag)
+def user_posts(request, username):
+    return post_list(
+        request, Post.objects.filter(author_id=find_user_id(username))
+    )
+
+
+@require_GET
+@login_required
+@cacheable(follow_etag)
+def follow_posts(request):
+    return post_list(
+        request, Timeline.objects.filter(user=request.user), prefix='post__'
+    )
+
+
+@require_GET
+@cacheable(post_etag)
+def post(request, post_id):
+    try:
+        fields = parse_fields(request.GET.get('fields'), POST_FIELDS)
+    except FieldError as exc:
+        return error(400, str(exc))
+    rows = Post.objects.filter(id=post_id).values(
+        *columns(fields, POST_FIELDS)
+    )
+    results = serialize_posts(rows, fields)
+    if not results:
+        return error(404, 'Не найдено')
+    return JsonResponse(
+        results[0], json_dumps_params={'ensure_ascii': False}
+    )
+
+
+@require_GET
+@cacheable(post_etag)
+def post_comments(request, post_id):
+    try:
+        fields, page = cursor_page(
+            request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+            cursor_fields=('created', 'id'),
+            per_page=settings.COMMENTS_PER_PAGE
+        )
+    except FieldError as exc:
+        return error(400, str(exc))
+    return page_response(
+        request, page, serialize_comments(page.object_list, fields)
+    )
+
+
+def parse_usernames(values):
+    if (not isinstance(values, list)
+            or not all(isinstance(value, str) for value in values)):
+        raise FieldError('usernames должен быть списком строк')
+    if len(values) > settings.FOLLOW_BATCH_LIMIT:
+        raise FieldError(
+            f'Не больше {settings.FOLLOW_BATCH_LIMIT} имён за запрос'
+        )
+    return list(dict.fromkeys(values))
+
+
+def user_ids(usernames):
+    """id пользователей по именам одним запросом."""
+    return dict(
+        User.objects.filter(username__in=usernames).values_list(
+            'username', 'id'
+        )
+    )
+
+
+def batch_follow(request, change):
+    try:
+        body = json.loads(request.body or b'{}')
+        usernames = parse_usernames(body.get('usernames'))
+    except (ValueError, AttributeError) as exc:
+        return error(400, str(exc))
+    ids = user_ids(usernames)
+    changed = set(change(request.user, list(ids.values())))
+    return JsonResponse({
+        'changed': [name for name in usernames if ids.get(name) in changed],
+        'not_found': [name for name in usernames if name not in ids],
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@require_POST
+@login_required
+def follow(request):
+    """Подписка на список авторов: {"usernames": [...]}."""
+    return batch_follow(request, follow_authors)
+
+
+@require_POST
+@login_required
+def unfollow(request):
+    return batch_follow(request, unfollow_authors)
+
+
+@require_GET
+@login_required
+def follow_status(request):
+    """Подписан ли пользователь на каждого из авторов ?usernames=a,b."""
+    try:
+        usernames = parse_usernames(
+            [name for name in request.GET.get('usernames', '').split(',')
+             if name]
+        )
+    except FieldError as exc:
+        return error(400, str(exc))
+    ids = user_ids(usernames)
+    following = get_following(request.user.id)
+    response = JsonResponse({
+        name: ids[name] in following for name in usernames if name in ids
+    }, json_dumps_params={'ensure_ascii': False})
+    patch_cache_control(response, private=True, max_age=0)
+    return response
@@ -0,0 +1,31 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite с дополнительными ключами OPTIONS.
+
+    pragmas — PRAGMA, которые выполняются для каждого нового
+    соединения с файлом базы (база в памяти не настраивается).
+    transaction_mode — режим BEGIN для atomic(). С IMMEDIATE
+    транзакция сразу берёт блокировку записи и ждёт busy_timeout,
+    а не падает с «database is locked», когда читающая транзакция
+    пытается начать запись.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        if not self.is_in_memory_db():
+            pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+            for name, value in pragmas.items():
+                conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
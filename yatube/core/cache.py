@@ -0,0 +1,399 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends import locmem
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+_missing = object()
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, stale REAL)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache(expires)',
+    'CREATE TABLE IF NOT EXISTS cache_lock ('
+    'key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)',
+)
+
+
+class MetricsCacheMixin:
+    """Считает попадания и промахи кэша в метриках текущего запроса."""
+
+    def record(self, hits, misses):
+        stats = metrics.current()
+        if stats is not None:
+            stats.hits += hits
+            stats.misses += misses
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version=version)
+        if value is _missing:
+            self.record(0, 1)
+            return default
+        self.record(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version=version)
+        self.record(len(found), len(keys) - len(found))
+        return found
+
+
+class LocMemCache(MetricsCacheMixin, locmem.LocMemCache):
+    # get_many здесь читает ключи через get(), который их уже считает.
+    get_many = locmem.LocMemCache.get_many
+
+
+class LocalTier:
+    """Первый уровень: LRU в памяти процесса, общий для всех потоков.
+
+    Хранит записи второго уровня не дольше timeout секунд, поэтому
+    изменения, сделанные другими процессами, видны с этой задержкой.
+    """
+
+    def __init__(self, max_entries, timeout):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.lock = threading.Lock()
+
+    def get(self, key, now):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1:]
+
+    def put(self, key, blob, expires, stale, now):
+        until = now + self.timeout
+        if stale is not None:
+            until = min(until, stale)
+        with self.lock:
+            self.entries[key] = (until, blob, expires, stale)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+# Файлы, в которых процесс уже включил WAL и создал таблицы.
+_prepared = set()
+
+
+class BaseTieredCache(BaseCache):
+    """Двухуровневый кэш: LRU в памяти процесса и общий файл SQLite.
+
+    Второй уровень общий для всех процессов сервера, поэтому значение,
+    посчитанное одним процессом, достаётся остальным.
+
+    Просроченная запись ещё STALE_TIMEOUT секунд отдаётся как есть,
+    пока её пересчитывает один из читателей: первому get() после
+    истечения достаётся промах и право на пересчёт, остальным —
+    прежнее значение. get_or_set() при полном промахе ждёт чужого
+    пересчёта, а не запускает свой.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.stale_timeout = options.get('STALE_TIMEOUT', 0)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self.poll_interval = options.get('POLL_INTERVAL', 0.05)
+        with _local_tiers_lock:
+            self.local = _local_tiers.setdefault(location, LocalTier(
+                options.get('LOCAL_MAX_ENTRIES', 1000),
+                options.get('LOCAL_TIMEOUT', 1),
+            ))
+        self.owner = f'{os.getpid()}:{threading.get_ident()}'
+        self._db = None
+        self._writes = 0
+
+    @property
+    def db(self):
+        # Экземпляры кэша Django свои у каждого потока,
+        # поэтому и соединение у каждого своё.
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute('PRAGMA synchronous=normal')
+            if self.path not in _prepared:
+                db.execute('PRAGMA journal_mode=wal')
+                for statement in SCHEMA:
+                    db.execute(statement)
+                _prepared.add(self.path)
+            self._db = db
+        return self._db
+
+    def key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def stale_until(self, expires):
+        if expires is None:
+            return None
+        return expires + self.stale_timeout
+
+    def lookup(self, keys, now):
+        """Записи (blob, expires, stale) сначала из памяти, потом из файла."""
+        found = {}
+        rest = []
+        for key in keys:
+            entry = self.local.get(key, now)
+            if entry is None:
+                rest.append(key)
+            else:
+                found[key] = entry
+        for start in range(0, len(rest), 500):
+            chunk = rest[start:start + 500]
+            rows = self.db.execute(
+                'SELECT key, value, expires, stale FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                chunk
+            )
+            for key, blob, expires, stale in rows:
+                if stale is not None and stale <= now:
+                    continue
+                self.local.put(key, blob, expires, stale, now)
+                found[key] = (blob, expires, stale)
+        return found
+
+    def fresh(self, entry, key, now):
+        """Значение записи или _missing, если её пора пересчитать."""
+        blob, expires, stale = entry
+        if expires is None or now < expires:
+            return pickle.loads(blob)
+        if stale is not None and now < stale and not self.acquire(key, now):
+            return pickle.loads(blob)
+        return _missing
+
+    def acquire(self, key, now=None):
+        """Берёт право на пересчёт ключа на lock_timeout секунд."""
+        now = now or time.time()
+        cursor = self.db.execute(
+            'INSERT INTO cache_lock (key, owner, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, '
+            'expires = excluded.expires '
+            'WHERE cache_lock.expires <= ? OR cache_lock.owner = ?',
+            (key, self.owner, now + self.lock_timeout, now, self.owner)
+        )
+        return cursor.rowcount > 0
+
+    def get(self, key, default=None, version=None):
+        key = self.key(key, version)
+        now = time.time()
+        entry = self.lookup([key], now).get(key)
+        if entry is None:
+            return default
+        value = self.fresh(entry, key, now)
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None):
+        names = {self.key(key, version): key for key in keys}
+        now = time.time()
+        result = {}
+        for key, entry in self.lookup(list(names), now).items():
+            value = self.fresh(entry, key, now)
+            if value is not _missing:
+                result[names[key]] = value
+        return result
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """Значение ключа; при промахе его считает только один процесс.
+
+        Остальные ждут до lock_timeout секунд, а потом считают сами.
+        """
+        value = self.get(key, _missing, version=version)
+        if value is not _missing:
+            return value
+        name = self.key(key, version)
+        deadline = time.monotonic() + self.lock_timeout
+        while not self.acquire(name) and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            value = self.get(key, _missing, version=version)
+            if value is not _missing:
+                return value
+        try:
+            value = default() if callable(default) else default
+        except Exception:
+            self.release([name])
+            raise
+        if value is not None:
+            self.set(key, value, timeout, version=version)
+        else:
+            self.release([name])
+        return value
+
+    def release(self, keys):
+        self.db.executemany(
+            'DELETE FROM cache_lock WHERE key = ?', [(key,) for key in keys]
+        )
+
+    def rows(self, data, expires):
+        return [
+            (key, pickle.dumps(value, self.pickle_protocol), expires,
+             self.stale_until(expires))
+            for key, value in data
+        ]
+
+    def write(self, rows):
+        now = time.time()
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires, stale) '
+                'VALUES (?, ?, ?, ?)', rows
+            )
+            db.executemany(
+                'DELETE FROM cache_lock WHERE key = ?',
+                [(row[0],) for row in rows]
+            )
+            self._writes += len(rows)
+            if self._writes >= 100:
+                self._writes = 0
+                self.cull(now)
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        for key, blob, expires, stale in rows:
+            self.local.put(key, blob, expires, stale, now)
+
+    def cull(self, now):
+        self.db.execute('DELETE FROM cache WHERE stale <= ?', (now,))
+        self.db.execute('DELETE FROM cache_lock WHERE expires <= ?', (now,))
+        count = self.db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            self.db.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency,)
+            )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        if expires is not None and expires <= time.time():
+            # Нулевой или отрицательный timeout удаляет ключи.
+            self.delete_many(list(data), version=version)
+            return []
+        self.write(self.rows(
+            [(self.key(key, version), value) for key, value in data.items()],
+            expires
+        ))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.key(key, version)
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        if expires is not None and expires <= now:
+            return False
+        row = self.rows([(key, value)], expires)[0]
+        cursor = self.db.execute(
+            'INSERT INTO cache (key, value, expires, stale) '
+            'VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+            'value = excluded.value, expires = excluded.expires, '
+            'stale = excluded.stale '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            row + (now,)
+        )
+        if cursor.rowcount > 0:
+            self.local.put(*row, now)
+            return True
+        return False
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        cursor = self.db.execute(
+            'UPDATE cache SET expires = ?, stale = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (expires, self.stale_until(expires), key, time.time())
+        )
+        self.local.discard([key])
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self.key(key, version)
+        now = time.time()
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                'SELECT value, expires, stale FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)', (key, now)
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            blob = pickle.dumps(value, self.pickle_protocol)
+            db.execute(
+                'UPDATE cache SET value = ? WHERE key = ?', (blob, key)
+            )
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        self.local.put(key, blob, row[1], row[2], now)
+        return value
+
+    def has_key(self, key, version=None):
+        return self.get(key, _missing, version=version) is not _missing
+
+    def delete(self, key, version=None):
+        return self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.key(key, version) for key in keys]
+        self.local.discard(keys)
+        cursor = self.db.executemany(
+            'DELETE FROM cache WHERE key = ?', [(key,) for key in keys]
+        )
+        self.release(keys)
+        return cursor.rowcount > 0
+
+    def clear(self):
+        self.local.clear()
+        self.db.execute('DELETE FROM cache')
+        self.db.execute('DELETE FROM cache_lock')
+
+    def close(self, **kwargs):
+        # Django закрывает кэши по сигналу request_finished. Соединение
+        # откроется заново при следующем обращении, а потоки сервера
+        # не держат открытыми файлы кэша между запросами.
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class TieredCache(MetricsCacheMixin, BaseTieredCache):
+    pass
@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from core import profiling
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Профилирует отрисовку шаблонов одной страницы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Адрес страницы, например /')
+        parser.add_argument(
+            '--user', help='Имя пользователя, от которого идёт запрос'
+        )
+        parser.add_argument(
+            '--output', help='Файл для свёрнутых стеков (flamegraph.pl)'
+        )
+        parser.add_argument(
+            '--top', type=int, default=20, help='Сколько строк вывести'
+        )
+
+    def handle(self, *args, **options):
+        client = Client()
+        if options['user']:
+            try:
+                client.force_login(User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f'Нет пользователя {options["user"]}')
+        with profiling.profile() as profile:
+            response = client.get(options['url'])
+        if response.status_code != 200:
+            raise CommandError(f'Страница ответила {response.status_code}')
+        self.stdout.write(
+            f'{"inclusive, мс":>14} {"exclusive, мс":>14} {"вызовы":>7}  имя'
+        )
+        for row in profile.report()[:options['top']]:
+            self.stdout.write(
+                f'{row["inclusive_ms"]:>14.3f} {row["exclusive_ms"]:>14.3f} '
+                f'{row["calls"]:>7}  {row["name"]}'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(profile.folded())
+            self.stdout.write(self.style.SUCCESS(
+                f'Свёрнутые стеки записаны в {options["output"]}'
+            ))
@@ -0,0 +1,149 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+TIME_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HISTOGRAMS = {
+    'yatube_request_duration_seconds': (
+        'Время обработки запроса', TIME_BUCKETS
+    ),
+    'yatube_db_queries': ('Число SQL-запросов на запрос', QUERY_BUCKETS),
+    'yatube_db_duration_seconds': (
+        'Суммарное время SQL-запросов на запрос', TIME_BUCKETS
+    ),
+    'yatube_template_render_seconds': (
+        'Время отрисовки шаблонов на запрос', TIME_BUCKETS
+    ),
+}
+COUNTERS = {
+    'yatube_responses_total': 'Ответы по адресам и кодам',
+    'yatube_cache_hits_total': 'Попадания в кэш',
+    'yatube_cache_misses_total': 'Промахи кэша',
+}
+
+_local = threading.local()
+
+
+class RequestStats:
+    """Замеры одного запроса, которые копят хуки БД, шаблонов и кэша."""
+
+    __slots__ = ('queries', 'db_time', 'template_time', 'hits', 'misses')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.hits = 0
+        self.misses = 0
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Гистограммы и счётчики процесса с метками по имени адреса.
+
+    Каждый процесс сервера собирает свои числа, Prometheus
+    складывает их при опросе всех процессов.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {
+            name: defaultdict(lambda buckets=buckets: Histogram(buckets))
+            for name, (_, buckets) in HISTOGRAMS.items()
+        }
+        self.counters = {name: defaultdict(int) for name in COUNTERS}
+
+    def record(self, view, status, duration, stats):
+        with self.lock:
+            histograms = self.histograms
+            histograms['yatube_request_duration_seconds'][view].observe(
+                duration
+            )
+            histograms['yatube_db_queries'][view].observe(stats.queries)
+            histograms['yatube_db_duration_seconds'][view].observe(
+                stats.db_time
+            )
+            histograms['yatube_template_render_seconds'][view].observe(
+                stats.template_time
+            )
+            self.counters['yatube_responses_total'][(view, status)] += 1
+            self.counters['yatube_cache_hits_total'][view] += stats.hits
+            self.counters['yatube_cache_misses_total'][view] += stats.misses
+
+    def render(self):
+        """Текстовый формат Prometheus 0.0.4."""
+        lines = []
+        with self.lock:
+            for name, (help_text, _) in HISTOGRAMS.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for view, histogram in sorted(self.histograms[name].items()):
+                    total = 0
+                    for bound, count in zip(
+                        histogram.buckets + ('+Inf',), histogram.counts
+                    ):
+                        total += count
+                        lines.append(
+                            f'{name}_bucket{{view="{view}",le="{bound}"}} '
+                            f'{total}'
+                        )
+                    lines.append(
+                        f'{name}_sum{{view="{view}"}} {histogram.sum}'
+                    )
+                    lines.append(f'{name}_count{{view="{view}"}} {total}')
+            for name, help_text in COUNTERS.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for labels, value in sorted(self.counters[name].items()):
+                    if name == 'yatube_responses_total':
+                        view, status = labels
+                        label = f'view="{view}",status="{status}"'
+                    else:
+                        label = f'view="{labels}"'
+                    lines.append(f'{name}{{{label}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def current():
+    """Замеры текущего запроса или None вне запроса."""
+    return getattr(_local, 'stats', None)
+
+
+def start():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def stop():
+    _local.stats = None
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка connection.execute_wrapper, считающая запросы."""
+    stats = current()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started
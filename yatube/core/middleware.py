@@ -0,0 +1,65 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics, profiling
+
+
+class MetricsMiddleware:
+    """Собирает метрики каждого запроса по имени адреса.
+
+    Должна стоять первой в MIDDLEWARE, чтобы время запроса
+    включало работу остальных прослоек.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        match = request.resolver_match
+        metrics.registry.record(
+            match.view_name if match else 'unresolved',
+            response.status_code,
+            time.perf_counter() - started,
+            stats
+        )
+        return response
+
+
+class TemplateProfilerMiddleware:
+    """Отчёт о времени отрисовки шаблонов вместо страницы.
+
+    Включается настройкой TEMPLATE_PROFILING и срабатывает только
+    для адресов METRICS_ALLOWED_IPS с параметром ?profile=json
+    или ?profile=folded.
+    """
+
+    def __init__(self, get_response):
+        if not settings.TEMPLATE_PROFILING:
+            raise MiddlewareNotUsed
+        profiling.install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        output = request.GET.get('profile')
+        if (output not in profiling.FORMATS
+                or request.META.get('REMOTE_ADDR')
+                not in settings.METRICS_ALLOWED_IPS):
+            return self.get_response(request)
+        with profiling.profile() as profile:
+            self.get_response(request)
+        return profiling.response(profile, output)
@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.http import HttpResponse, JsonResponse
+from django.template.base import Node, Template, TextNode, VariableNode
+
+# Форматы отчёта: таблица в JSON и свёрнутые стеки для flamegraph.pl,
+# speedscope и inferno.
+FORMATS = ('json', 'folded')
+
+_local = threading.local()
+_originals = {}
+
+
+class Profile:
+    """Время и число вызовов шаблонов, тегов и переменных.
+
+    Инклюзивное время включает вложенные вызовы, эксклюзивное —
+    только собственную работу узла.
+    """
+
+    def __init__(self):
+        self.stack = []
+        # Имя -> [вызовы, инклюзивное время, эксклюзивное время].
+        self.totals = defaultdict(lambda: [0, 0.0, 0.0])
+        self.stacks = defaultdict(float)
+
+    def enter(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def leave(self):
+        name, started, children = self.stack.pop()
+        elapsed = time.perf_counter() - started
+        path = ';'.join([frame[0] for frame in self.stack] + [name])
+        if self.stack:
+            self.stack[-1][2] += elapsed
+        totals = self.totals[name]
+        totals[0] += 1
+        # При рекурсии время внешнего вызова уже включает внутренний.
+        if all(frame[0] != name for frame in self.stack):
+            totals[1] += elapsed
+        totals[2] += elapsed - children
+        self.stacks[path] += elapsed - children
+
+    def report(self):
+        rows = [
+            {
+                'name': name,
+                'calls': calls,
+                'inclusive_ms': round(inclusive * 1000, 3),
+                'exclusive_ms': round(exclusive * 1000, 3),
+            }
+            for name, (calls, inclusive, exclusive) in self.totals.items()
+        ]
+        return sorted(rows, key=lambda row: -row['inclusive_ms'])
+
+    def folded(self):
+        """Свёрнутые стеки: путь через «;» и время в микросекундах."""
+        return ''.join(
+            f'{path} {round(seconds * 1_000_000)}\n'
+            for path, seconds in sorted(self.stacks.items())
+        )
+
+
+def current():
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def profile():
+    """Профилирует шаблоны, отрисованные внутри блока в этом потоке."""
+    install()
+    _local.profile = Profile()
+    try:
+        yield _local.profile
+    finally:
+        _local.profile = None
+
+
+def node_name(node):
+    name = getattr(node, '_profile_name', None)
+    if name is None:
+        token = getattr(node, 'token', None)
+        if token is None:
+            name = type(node).__name__
+        elif isinstance(node, VariableNode):
+            name = '{{ %s }}' % token.contents
+        else:
+            name = '{%% %s %%}' % token.split_contents()[0]
+        # «;» разделяет кадры в свёрнутых стеках.
+        name = name.replace(';', ',')
+        node._profile_name = name
+    return name
+
+
+def render_template(self, context):
+    profile = current()
+    if profile is None:
+        return _originals['template'](self, context)
+    profile.enter(
+        f'template:{self.origin.template_name or self.origin.name}'
+    )
+    try:
+        return _originals['template'](self, context)
+    finally:
+        profile.leave()
+
+
+def render_node(self, context):
+    profile = current()
+    if profile is None or isinstance(self, TextNode):
+        return _originals['node'](self, context)
+    profile.enter(node_name(self))
+    try:
+        return _originals['node'](self, context)
+    finally:
+        profile.leave()
+
+
+def install():
+    """Подменяет отрисовку шаблонов и узлов замеряющими обёртками.
+
+    Template._render вызывается и для родителя в {% extends %},
+    поэтому base.html тоже попадает в отчёт. Без активного профиля
+    обёртки сразу вызывают исходные методы.
+    """
+    if _originals:
+        return
+    _originals['template'] = Template._render
+    _originals['node'] = Node.render_annotated
+    Template._render = render_template
+    Node.render_annotated = render_node
+
+
+def response(profile, output):
+    if output == 'folded':
+        result = HttpResponse(
+            profile.folded(), content_type='text/plain; charset=utf-8'
+        )
+        result['Content-Disposition'] = (
+            'attachment; filename="templates.folded"'
+        )
+        return result
+    return JsonResponse(
+        {'templates': profile.report()},
+        json_dumps_params={'ensure_ascii': False}
+    )
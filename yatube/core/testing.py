@@ -0,0 +1,44 @@
+import copy
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner as BaseDiscoverRunner
+from django.utils.module_loading import import_string
+
+from .cache import BaseTieredCache
+
+
+@contextmanager
+def temporary_caches():
+    """Переносит файлы кэшей во временный каталог на время блока.
+
+    Тесты не видят записей прошлых запусков и не трогают кэш,
+    которым пользуется сервер.
+    """
+    directory = tempfile.mkdtemp(prefix='yatube-cache-')
+    caches = copy.deepcopy(settings.CACHES)
+    for alias, params in caches.items():
+        if issubclass(import_string(params['BACKEND']), BaseTieredCache):
+            params['LOCATION'] = os.path.join(directory, f'{alias}.sqlite3')
+    try:
+        with override_settings(CACHES=caches):
+            yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class DiscoverRunner(BaseDiscoverRunner):
+    """Запуск тестов с кэшами во временном каталоге."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._stack = ExitStack()
+        self._stack.enter_context(temporary_caches())
+
+    def teardown_test_environment(self, **kwargs):
+        self._stack.close()
+        super().teardown_test_environment(**kwargs)
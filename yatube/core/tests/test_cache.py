@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.test import SimpleTestCase
+
+from core import metrics
+from core.cache import LocalTier, TieredCache
+
+
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, owner=None):
+        cache = TieredCache(self.location, {'OPTIONS': {
+            'STALE_TIMEOUT': 60,
+            'LOCK_TIMEOUT': 2,
+            'POLL_INTERVAL': 0.01,
+        }})
+        if owner:
+            cache.owner = owner
+        return cache
+
+    def test_local_tier_lru(self):
+        """Первый уровень вытесняет давно не читанные записи"""
+        tier = LocalTier(max_entries=2, timeout=10)
+        for key in ('a', 'b'):
+            tier.put(key, b'', None, None, 0)
+        tier.get('a', 0)
+        tier.put('c', b'', None, None, 0)
+        self.assertIsNotNone(tier.get('a', 0))
+        self.assertIsNone(tier.get('b', 0))
+        self.assertIsNone(tier.get('a', 11))
+
+    def test_shared_tier(self):
+        """Значение из памяти другого процесса достаётся через файл"""
+        self.cache.set('key', {'value': 1}, None)
+        self.cache.local.clear()
+        self.assertEqual(self.make_cache().get('key'), {'value': 1})
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.cache.local.clear()
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': 2})
+
+    def test_basic_operations(self):
+        """add, incr, touch и delete работают как у кэшей Django"""
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.incr('key', 5), 6)
+        self.assertEqual(self.cache.get('key'), 6)
+        self.assertTrue(self.cache.touch('key', 100))
+        self.assertTrue(self.cache.delete('key'))
+        self.assertIsNone(self.cache.get('key'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('key')
+        self.cache.set('key', 1, 0)
+        self.assertFalse(self.cache.has_key('key'))
+
+    def test_stale_while_revalidate(self):
+        """Просроченное значение отдаётся всем, кроме пересчитывающего"""
+        other = self.make_cache(owner='other')
+        now = time.time()
+        self.cache.set('key', 'old', 10)
+        with mock.patch('core.cache.time.time', return_value=now + 20):
+            self.assertIsNone(self.cache.get('key'))
+            self.assertEqual(other.get('key'), 'old')
+            self.cache.set('key', 'new', 10)
+            self.assertEqual(other.get('key'), 'new')
+        with mock.patch('core.cache.time.time', return_value=now + 100):
+            self.assertIsNone(other.get('key'))
+
+    def test_get_or_set_coalesces(self):
+        """При промахе значение считает только один поток"""
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        def worker():
+            results.append(self.make_cache().get_or_set('key', compute, 60))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 5)
+
+    def test_failed_compute_releases_lock(self):
+        """Ошибка пересчёта не оставляет ключ заблокированным"""
+        def fail():
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            self.cache.get_or_set('key', fail)
+        other = self.make_cache(owner='other')
+        self.assertTrue(other.acquire(other.key('key', None)))
+
+    def test_get_many_counted(self):
+        """get_many учитывается в попаданиях и промахах запроса"""
+        self.cache.set_many({'a': 1, 'b': 2})
+        stats = metrics.start()
+        try:
+            self.cache.get_many(['a', 'b', 'c'])
+        finally:
+            metrics.stop()
+        self.assertEqual((stats.hits, stats.misses), (2, 1))
+
+    def test_closed_after_request(self):
+        """Соединение с файлом закрывается в конце запроса"""
+        cache.set('key', 1)
+        request_finished.send(sender=self.__class__)
+        self.assertIsNone(cache._db)
+        self.assertEqual(cache.get('key'), 1)
+
+    def test_tests_use_temporary_file(self):
+        """Тесты пишут не в файл кэша сервера"""
+        self.assertNotEqual(
+            cache.path, os.path.join(settings.BASE_DIR, 'cache',
+                                     'default.sqlite3')
+        )
@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import metrics
+from core.metrics import Registry, RequestStats
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_metrics_collected(self):
+        """Запрос к странице попадает в метрики по имени адреса"""
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(reverse('posts:index'))
+        response = self.guest_client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        for line in (
+            'yatube_request_duration_seconds_count{view="posts:index"} ',
+            'yatube_db_queries_count{view="posts:index"} ',
+            'yatube_template_render_seconds_count{view="posts:index"} ',
+            'yatube_responses_total{view="posts:index",status="200"} ',
+            'yatube_cache_hits_total{view="posts:index"} ',
+            'yatube_cache_misses_total{view="posts:index"} ',
+        ):
+            with self.subTest(line=line):
+                self.assertIn(line, text)
+
+    def test_cached_page_named(self):
+        """Страница из кэша гостей учитывается под именем адреса"""
+        registry = Registry()
+        with mock.patch.object(metrics, 'registry', registry):
+            self.guest_client.get(reverse('posts:index'))
+            with self.assertNumQueries(0):
+                self.guest_client.get(reverse('posts:index'))
+        text = registry.render()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text
+        )
+        self.assertNotIn('unresolved', text)
+
+    def test_metrics_closed_for_others(self):
+        """Метрики недоступны с посторонних адресов"""
+        response = self.guest_client.get(
+            reverse('metrics'), REMOTE_ADDR='10.0.0.1'
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_registry_render(self):
+        """Гистограммы выводятся накопительно в формате Prometheus"""
+        registry = Registry()
+        for queries in (1, 3, 200):
+            stats = RequestStats()
+            stats.queries = queries
+            stats.hits = 2
+            registry.record('posts:index', 200, 0.02, stats)
+        text = registry.render()
+        self.assertIn('yatube_db_queries_bucket{view="posts:index",le="1"} 1',
+                      text)
+        self.assertIn('yatube_db_queries_bucket{view="posts:index",le="3"} 2',
+                      text)
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:index",le="+Inf"} 3', text
+        )
+        self.assertIn('yatube_db_queries_sum{view="posts:index"} 204', text)
+        self.assertIn('yatube_cache_hits_total{view="posts:index"} 6', text)
@@ -0,0 +1,102 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import engines
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import profiling
+from posts.models import Post
+
+User = get_user_model()
+
+
+class TemplateProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_inclusive_and_exclusive_time(self):
+        """Время вложенных узлов входит в инклюзивное время родителя"""
+        template = engines.all()[0].from_string(
+            '{% for i in items %}{{ i }}{% endfor %}'
+        )
+        with profiling.profile() as profile:
+            template.render({'items': range(3)})
+        rows = {row['name']: row for row in profile.report()}
+        loop = rows['{% for %}']
+        self.assertEqual(loop['calls'], 1)
+        self.assertEqual(rows['{{ i }}']['calls'], 3)
+        self.assertGreaterEqual(loop['inclusive_ms'], loop['exclusive_ms'])
+        self.assertGreaterEqual(
+            loop['inclusive_ms'], rows['{{ i }}']['inclusive_ms']
+        )
+        self.assertIn(
+            'template:<unknown source>;{% for %};{{ i }} ', profile.folded()
+        )
+
+    def test_page_attribution(self):
+        """Отчёт по странице разбит по шаблонам, include и тегам"""
+        with profiling.profile() as profile:
+            Client().get(reverse('posts:index'))
+        names = {row['name'] for row in profile.report()}
+        for name in (
+            'template:posts/index.html',
+            'template:base.html',
+            'template:includes/header.html',
+            'template:posts/includes/paginator.html',
+            '{% include %}',
+            '{% url %}',
+        ):
+            with self.subTest(name=name):
+                self.assertIn(name, names)
+        self.assertIn(
+            'template:posts/index.html;{% extends %};template:base.html;',
+            profile.folded()
+        )
+
+    def test_no_profile_without_request(self):
+        """Вне профилирования обёртки ничего не собирают"""
+        profiling.install()
+        Client().get(reverse('posts:index'))
+        self.assertIsNone(profiling.current())
+
+    @override_settings(TEMPLATE_PROFILING=True)
+    def test_middleware(self):
+        """?profile=json и ?profile=folded отдают отчёт вместо страницы"""
+        client = Client()
+        response = client.get(reverse('posts:index'), {'profile': 'json'})
+        names = [row['name'] for row in response.json()['templates']]
+        self.assertIn('template:posts/index.html', names)
+        response = client.get(reverse('posts:index'), {'profile': 'folded'})
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertTrue(
+            response.content.decode().startswith('template:')
+        )
+        response = client.get(
+            reverse('posts:index'), {'profile': 'json'},
+            REMOTE_ADDR='10.0.0.1'
+        )
+        self.assertContains(response, 'Тестовый пост')
+
+    def test_command(self):
+        """Команда выводит таблицу и пишет свёрнутые стеки в файл"""
+        output = os.path.join(tempfile.mkdtemp(), 'index.folded')
+        out = StringIO()
+        call_command(
+            'profile_templates', '/', '--user', 'HasNoName',
+            '--output', output, stdout=out
+        )
+        self.assertIn('template:posts/index.html', out.getvalue())
+        with open(output) as folded:
+            self.assertIn('template:base.html', folded.read())
+        os.remove(output)
@@ -0,0 +1,320 @@
+import math
+import platform
+import random
+import threading
+import time
+from contextlib import contextmanager
+from io import BytesIO
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import (OperationalError, close_old_connections, connection,
+                       connections, transaction)
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import temporary_caches
+from mixer.backend.django import Mixer
+from PIL import Image
+
+from . import thumbnails
+from .models import Comment, Follow, Group, Post, User
+from .urls import urlpatterns
+
+DATASET = {
+    'users': 100,
+    'groups': 10,
+    'posts': 1000,
+    'follows': 500,
+    'comments': 2000,
+    'images': 20,
+}
+
+
+@contextmanager
+def benchmark_caches(locmem=False):
+    """Кэши на время замера.
+
+    По умолчанию это кэши из settings (TieredCache) в свежих файлах,
+    чтобы замер учитывал настоящий кэш и не трогал кэш сервера.
+    С locmem=True — LocMemCache в памяти процесса, каждый раз пустой.
+    """
+    if locmem:
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'core.cache.LocMemCache',
+            'LOCATION': 'benchmark',
+        }}):
+            cache.clear()
+            yield
+    else:
+        with temporary_caches():
+            yield
+
+
+def make_image(rnd, name):
+    output = BytesIO()
+    color = tuple(rnd.randrange(256) for _ in range(3))
+    Image.new('RGB', (1200, 800), color).save(output, 'JPEG')
+    return SimpleUploadedFile(name, output.getvalue(), 'image/jpeg')
+
+
+def seed(users, groups, posts, follows, comments, images, seed=0):
+    """Заполняет базу воспроизводимым набором данных.
+
+    Возвращает пользователя, от имени которого идут запросы:
+    он подписан на часть авторов и сам пишет посты.
+    """
+    rnd = random.Random(seed)
+    mixer = Mixer(locale='ru')
+    mixer.faker.seed_instance(seed)
+    authors = [
+        mixer.blend(User, username=f'bench{i}') for i in range(users)
+    ]
+    group_list = [
+        mixer.blend(Group, slug=f'bench-{i}') for i in range(groups)
+    ]
+    for i in range(posts):
+        image = make_image(rnd, f'bench{i}.jpg') if i < images else ''
+        post = mixer.blend(
+            Post,
+            author=rnd.choice(authors),
+            group=rnd.choice(group_list + [None]),
+            text=mixer.faker.text(),
+            image=image,
+        )
+        if image:
+            thumbnails.render(post.image)
+    viewer = authors[0]
+    pairs = {
+        (viewer, author) for author in authors[1:min(follows, users // 2) + 1]
+    }
+    while len(pairs) < min(follows, users * (users - 1)):
+        user, author = rnd.sample(authors, 2)
+        pairs.add((user, author))
+    for user, author in pairs:
+        Follow.objects.create(user=user, author=author)
+    post_list = list(Post.objects.order_by('id'))
+    for _ in range(comments):
+        mixer.blend(
+            Comment,
+            post=rnd.choice(post_list),
+            author=rnd.choice(authors),
+            text=mixer.faker.sentence(),
+        )
+    return viewer
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def url_kwargs(rnd, post_ids, slugs):
+    post = Post.objects.select_related('author').get(id=rnd.choice(post_ids))
+    return {
+        'slug': rnd.choice(slugs),
+        'username': post.author.username,
+        'post_id': post.id,
+    }, rnd.choice(post.text.split()).strip('.,')
+
+
+def measure(viewer, requests, seed=0, cold=False):
+    """Запрашивает каждый адрес posts и собирает статистику.
+
+    Изменения, сделанные страницами, откатываются, поэтому все
+    запросы идут к одним и тем же данным.
+    """
+    rnd = random.Random(seed)
+    client = Client()
+    client.force_login(viewer)
+    samples = {pattern.name: [] for pattern in urlpatterns}
+    post_ids = sorted(Post.objects.values_list('id', flat=True))
+    slugs = sorted(Group.objects.values_list('slug', flat=True))
+    for _ in range(requests):
+        kwargs, word = url_kwargs(rnd, post_ids, slugs)
+        for pattern in urlpatterns:
+            url = reverse(f'posts:{pattern.name}', kwargs={
+                name: kwargs[name] for name in pattern.pattern.converters
+            })
+            if pattern.name == 'search':
+                url += f'?q={word}'
+            if cold:
+                cache.clear()
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+            samples[pattern.name].append(
+                (elapsed * 1000, len(queries), len(response.content),
+                 response.status_code)
+            )
+    return {name: summary(rows) for name, rows in samples.items()}
+
+
+class ThreadClient(Client):
+    """Клиент, который принимает только исключения своего потока.
+
+    Обычный Client ловит сигнал got_request_exception от запросов
+    всех потоков и выдал бы чужую ошибку записи за ошибку чтения.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.thread = threading.current_thread()
+
+    def store_exc_info(self, **kwargs):
+        if threading.current_thread() is self.thread:
+            super().store_exc_info(**kwargs)
+
+
+def load_request(kind, rnd, client, number, targets):
+    """Один запрос потока: запись поста или комментария либо чтение
+    одной из страниц лент."""
+    users, post_ids, slugs = targets
+    if kind == 'write':
+        if number % 2:
+            return client.post(reverse('posts:post_create'), {
+                'text': f'Пост {number}',
+            })
+        return client.post(
+            reverse('posts:add_comment', kwargs={
+                'post_id': rnd.choice(post_ids)
+            }),
+            {'text': f'Комментарий {number}'}
+        )
+    return client.get(rnd.choice([
+        reverse('posts:index'),
+        reverse('posts:group_list', args=[rnd.choice(slugs)]),
+        reverse('posts:profile', args=[rnd.choice(users).username]),
+        reverse('posts:post_detail', args=[rnd.choice(post_ids)]),
+    ]))
+
+
+def load_worker(kind, index, targets, deadline, seed):
+    """Шлёт запросы до deadline и возвращает пары (время, успех).
+
+    После каждого запроса поток закрывает соединение по правилам
+    CONN_MAX_AGE, как это делает сервер в конце запроса.
+    """
+    rnd = random.Random(f'{seed}-{kind}-{index}')
+    users = targets[0]
+    client = ThreadClient()
+    client.force_login(users[index % len(users)])
+    rows = []
+    number = 0
+    try:
+        while time.monotonic() < deadline:
+            number += 1
+            started = time.perf_counter()
+            try:
+                response = load_request(kind, rnd, client, number, targets)
+                ok = response.status_code < 400
+            except OperationalError:
+                ok = False
+            rows.append((time.perf_counter() - started, ok))
+            close_old_connections()
+    finally:
+        connections.close_all()
+    return rows
+
+
+def load_summary(rows, elapsed):
+    latency = [row[0] * 1000 for row in rows if row[1]] or [0]
+    return {
+        'requests': len(rows),
+        'errors': sum(1 for row in rows if not row[1]),
+        'per_second': round(len(rows) / elapsed, 1),
+        'p50_ms': round(percentile(latency, 50), 3),
+        'p95_ms': round(percentile(latency, 95), 3),
+        'p99_ms': round(percentile(latency, 99), 3),
+    }
+
+
+def concurrency(readers, writers, duration, seed=0):
+    """Читает страницы в readers потоков, пока writers потоков
+    добавляют комментарии и посты."""
+    targets = (
+        list(User.objects.order_by('id')),
+        sorted(Post.objects.values_list('id', flat=True)),
+        sorted(Group.objects.values_list('slug', flat=True)),
+    )
+    deadline = time.monotonic() + duration
+    samples = {'read': [], 'write': []}
+    lock = threading.Lock()
+
+    def worker(kind, index):
+        rows = load_worker(kind, index, targets, deadline, seed)
+        with lock:
+            samples[kind].extend(rows)
+
+    threads = [
+        threading.Thread(target=worker, args=(kind, index))
+        for kind, count in (('read', readers), ('write', writers))
+        for index in range(count)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    return {
+        kind: load_summary(rows, elapsed) for kind, rows in samples.items()
+    }
+
+
+def summary(rows):
+    latency = [row[0] for row in rows]
+    queries = [row[1] for row in rows]
+    sizes = [row[2] for row in rows]
+    return {
+        'requests': len(rows),
+        'status': sorted({row[3] for row in rows}),
+        'p50_ms': round(percentile(latency, 50), 3),
+        'p95_ms': round(percentile(latency, 95), 3),
+        'p99_ms': round(percentile(latency, 99), 3),
+        'queries_mean': round(sum(queries) / len(queries), 2),
+        'queries_max': max(queries),
+        'bytes_mean': round(sum(sizes) / len(sizes)),
+    }
+
+
+def report(dataset, views, requests, seed, cold):
+    return {
+        'created': timezone.now().isoformat(),
+        'django': django.get_version(),
+        'python': platform.python_version(),
+        'sqlite': connection.Database.sqlite_version,
+        'seed': seed,
+        'cold_cache': cold,
+        'cache': settings.CACHES['default']['BACKEND'],
+        'requests': requests,
+        'dataset': dataset,
+        'views': views,
+    }
+
+
+def compare(old, new):
+    """Строки с изменением p95 и числа запросов по каждому адресу."""
+    lines = []
+    for name, stats in new['views'].items():
+        before = old['views'].get(name)
+        if before is None:
+            lines.append(f'{name}: новый адрес')
+            continue
+        change = stats['p95_ms'] - before['p95_ms']
+        percent = change / before['p95_ms'] * 100 if before['p95_ms'] else 0
+        lines.append(
+            f'{name}: p95 {before["p95_ms"]} -> {stats["p95_ms"]} мс '
+            f'({percent:+.1f}%), запросов {before["queries_max"]} -> '
+            f'{stats["queries_max"]}'
+        )
+    return lines
@@ -0,0 +1,101 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserCounter
+
+USER_COUNTERS = {
+    'posts': (Post, 'author'),
+    'followers': (Follow, 'author'),
+    'following': (Follow, 'user'),
+}
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField()
+    ), 0)
+
+
+def exact_user_counts(user_id):
+    return {
+        name: model.objects.filter(**{f'{field}_id': user_id}).count()
+        for name, (model, field) in USER_COUNTERS.items()
+    }
+
+
+def floored(name, delta):
+    # Счётчики беззнаковые: разошедшийся с таблицей счётчик не должен
+    # уводить UPDATE в IntegrityError и отменять удаление записи.
+    return Greatest(F(name) + delta, 0)
+
+
+def change_user_counter(user_id, create=True, **deltas):
+    """Меняет счётчики пользователя на deltas одним UPDATE.
+
+    Если строки счётчиков ещё нет, она создаётся по точным значениям,
+    которые уже учитывают текущую запись.
+    """
+    updated = UserCounter.objects.filter(user_id=user_id).update(
+        **{name: floored(name, delta) for name, delta in deltas.items()}
+    )
+    if not updated and create:
+        UserCounter.objects.get_or_create(
+            user_id=user_id, defaults=exact_user_counts(user_id)
+        )
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=floored('comments_count', delta)
+    )
+
+
+def get_counter(user):
+    try:
+        return user.counter
+    except UserCounter.DoesNotExist:
+        counter, _ = UserCounter.objects.get_or_create(
+            user=user, defaults=exact_user_counts(user.id)
+        )
+        return counter
+
+
+def repair(dry_run=False):
+    """Сверяет счётчики с таблицами и исправляет расхождения.
+
+    Возвращает число исправленных пользователей и постов.
+    """
+    users = User.objects.annotate(**{
+        f'real_{name}': count_subquery(model, field)
+        for name, (model, field) in USER_COUNTERS.items()
+    }).select_related('counter')
+    missing, drifted = [], []
+    for user in users.iterator():
+        real = {name: getattr(user, f'real_{name}') for name in USER_COUNTERS}
+        try:
+            counter = user.counter
+        except UserCounter.DoesNotExist:
+            missing.append(UserCounter(user=user, **real))
+            continue
+        if any(getattr(counter, name) != value
+               for name, value in real.items()):
+            for name, value in real.items():
+                setattr(counter, name, value)
+            drifted.append(counter)
+    posts = list(
+        Post.objects.annotate(
+            real_comments=count_subquery(Comment, 'post')
+        ).exclude(comments_count=F('real_comments'))
+    )
+    for post in posts:
+        post.comments_count = post.real_comments
+    if not dry_run:
+        UserCounter.objects.bulk_create(missing, batch_size=500)
+        UserCounter.objects.bulk_update(
+            drifted, list(USER_COUNTERS), batch_size=500
+        )
+        Post.objects.bulk_update(posts, ['comments_count'], batch_size=500)
+    return len(missing) + len(drifted), len(posts)
@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def feed_key(kind, pk=None):
+    """Ключ счётчика ленты: global, group, author или follower."""
+    if pk is None:
+        return f'feed_count:{kind}'
+    return f'feed_count:{kind}:{pk}'
+
+
+def post_feed_keys(post, group_id=None):
+    keys = [feed_key('global'), feed_key('author', post.author_id)]
+    group_id = post.group_id if group_id is None else group_id
+    if group_id:
+        keys.append(feed_key('group', group_id))
+    return keys
+
+
+def get_feed_count(key, queryset):
+    """Возвращает число записей ленты и признак того, что оно оценочное.
+
+    Пока значение в кэше свежее, его поддерживают сигналы записи постов.
+    Устаревшее значение пересчитывается запросом с LIMIT, поэтому
+    для больших лент остаётся оценкой, а не полным COUNT(*).
+    """
+    meta_key = f'{key}:meta'
+    values = cache.get_many([key, meta_key])
+    count, meta = values.get(key), values.get(meta_key)
+    if count is not None and meta is not None:
+        checked, approximate = meta
+        if time.time() - checked < settings.FEED_COUNT_MAX_AGE:
+            return count, approximate
+    limit = settings.FEED_COUNT_LIMIT
+    bounded = queryset.order_by()[:limit].count()
+    approximate = bounded >= limit
+    if approximate:
+        count = max(count or 0, bounded)
+    else:
+        count = bounded
+    cache.set_many({key: count, meta_key: (time.time(), approximate)}, None)
+    return count, approximate
+
+
+def change_feed_counts(keys, delta):
+    for key in keys:
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Счётчика ещё нет в кэше: он будет посчитан при чтении.
+            pass
+
+
+def reset_feed_counts(keys):
+    cache.delete_many(keys + [f'{key}:meta' for key in keys])
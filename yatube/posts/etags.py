@@ -0,0 +1,126 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .counts import feed_key
+from .fragments import get_generations
+from .models import Group, Post, User
+
+
+def post_key(post_id):
+    """Поколение страницы поста: текст, картинка и комментарии."""
+    return f'post:{post_id}'
+
+
+def profile_key(user_id):
+    """Поколение шапки профиля: число подписчиков и подписок."""
+    return f'profile:{user_id}'
+
+
+def address_part(value):
+    # Имя пользователя может содержать символы, недопустимые
+    # в ключах кэша (CacheKeyWarning), поэтому в ключ идёт хэш.
+    return md5(value.encode()).hexdigest()
+
+
+def group_lookup_key(slug):
+    """Кэш id группы по slug из адреса страницы."""
+    return f'etag:group:{address_part(slug)}'
+
+
+def user_lookup_key(username):
+    """Кэш id пользователя по имени из адреса профиля."""
+    return f'etag:user:{address_part(username)}'
+
+
+def post_author_lookup_key(post_id):
+    """Кэш автора поста для ETag его страницы."""
+    return f'etag:post_author:{post_id}'
+
+
+def lookup(key, fetch):
+    value = cache.get(key)
+    if value is None:
+        value = fetch()
+        if value is not None:
+            cache.set(key, value, settings.FEED_CACHE_TIMEOUT)
+    return value
+
+
+def make_etag(request, keys, shared=False):
+    """ETag из поколений страницы, зрителя и параметров запроса.
+
+    Поколения уже лежат в кэше и меняются сигналами при каждой
+    записи, поэтому ответ 304 не требует запросов к постам.
+    С shared=True зритель не учитывается: такой ключ общий
+    для страницы с дырками.
+    """
+    parts = get_generations(keys)
+    if not shared:
+        # До AuthenticationMiddleware (кэш страниц) пользователя ещё
+        # нет, и такой запрос считается анонимным.
+        user = getattr(request, 'user', None)
+        parts.extend([
+            str(user.pk if user else None),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        ])
+    parts.append(request.META.get('QUERY_STRING', ''))
+    return md5(':'.join(parts).encode()).hexdigest()
+
+
+def index_etag(request, shared=False):
+    return make_etag(request, [feed_key('global')], shared)
+
+
+def find_group_id(slug):
+    """id группы или None, если её нет. Запоминается в кэше."""
+    return lookup(
+        group_lookup_key(slug),
+        Group.objects.filter(slug=slug).values_list('id', flat=True).first
+    )
+
+
+def find_user_id(username):
+    """id пользователя или None, если его нет. Запоминается в кэше."""
+    return lookup(
+        user_lookup_key(username),
+        User.objects.filter(
+            username=username
+        ).values_list('id', flat=True).first
+    )
+
+
+def group_etag(request, slug, shared=False):
+    group_id = find_group_id(slug)
+    if group_id is None:
+        return None
+    return make_etag(request, [feed_key('group', group_id)], shared)
+
+
+def profile_etag(request, username, shared=False):
+    user_id = find_user_id(username)
+    if user_id is None:
+        return None
+    return make_etag(
+        request, [feed_key('author', user_id), profile_key(user_id)], shared
+    )
+
+
+def post_author_id(post_id):
+    """id автора поста или None, если поста нет. Запоминается в кэше."""
+    return lookup(
+        post_author_lookup_key(post_id),
+        Post.objects.filter(
+            id=post_id
+        ).values_list('author_id', flat=True).first
+    )
+
+
+def post_etag(request, post_id, shared=False):
+    author_id = post_author_id(post_id)
+    if author_id is None:
+        return None
+    return make_etag(
+        request, [post_key(post_id), feed_key('author', author_id)], shared
+    )
@@ -0,0 +1,156 @@
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from . import timeline
+from .counters import change_user_counter
+from .counts import feed_key, reset_feed_counts
+from .etags import profile_key
+from .fragments import bump_generations
+from .models import Follow, UserCounter
+
+_local = threading.local()
+
+# Сколько раз повторяется подписка, сорванная параллельным запросом.
+FOLLOW_ATTEMPTS = 3
+
+
+def following_key(user_id):
+    return f'following:{user_id}'
+
+
+def get_following(user_id):
+    """Множество id авторов, на которых подписан пользователь.
+
+    Загружается из базы и живёт в кэше до подписки или отписки
+    пользователя, но не дольше FEED_CACHE_TIMEOUT.
+    """
+    key = following_key(user_id)
+    authors = cache.get(key)
+    if authors is None:
+        authors = set(
+            Follow.objects.filter(user_id=user_id).values_list(
+                'author_id', flat=True
+            )
+        )
+        cache.set(key, authors, settings.FEED_CACHE_TIMEOUT)
+    return authors
+
+
+def forget_following(user_id):
+    """Сбрасывает множество подписок сейчас и после фиксации транзакции.
+
+    Между ними параллельный запрос может закэшировать множество
+    без новой подписки, его убирает второй сброс. При откате
+    множество просто загрузится заново.
+    """
+    key = following_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(partial(cache.delete, key))
+
+
+def is_following(user, author):
+    return user.is_authenticated and author.id in get_following(user.id)
+
+
+def followed_changed(user_id, author_ids, delta):
+    """Побочные эффекты пакетной подписки или отписки.
+
+    Делают то же, что сигналы Follow для одной записи, но одним
+    запросом на каждую таблицу. Кэш меняется сразу и ещё раз после
+    фиксации, как в forget_following.
+    """
+    change_user_counter(user_id, following=delta * len(author_ids))
+    UserCounter.objects.filter(user_id__in=author_ids).update(
+        followers=F('followers') + delta
+    )
+    if delta > 0:
+        timeline.backfill_many(user_id, author_ids)
+    else:
+        timeline.remove_many(user_id, author_ids)
+    forget_following(user_id)
+    keys = [feed_key('follower', user_id)]
+    generation_keys = keys + [profile_key(user_id)] + [
+        profile_key(author_id) for author_id in author_ids
+    ]
+
+    def refresh():
+        reset_feed_counts(keys)
+        bump_generations(generation_keys)
+
+    refresh()
+    transaction.on_commit(refresh)
+
+
+def follow_authors(user, author_ids):
+    """Подписывает пользователя на авторов одним bulk_create.
+
+    Возвращает id авторов, подписка на которых появилась сейчас.
+    Вставка идёт целиком или никак, поэтому счётчики меняются ровно
+    на вставленные строки. Если параллельный запрос успел подписать
+    на кого-то из авторов, подписка повторяется без него, но не больше
+    FOLLOW_ATTEMPTS раз: иначе ошибка не из-за гонки повторялась бы
+    бесконечно.
+    """
+    for attempt in range(1, FOLLOW_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                existing = set(
+                    Follow.objects.filter(
+                        user=user, author_id__in=author_ids
+                    ).values_list('author_id', flat=True)
+                )
+                new_ids = sorted(set(author_ids) - existing - {user.id})
+                if not new_ids:
+                    return []
+                Follow.objects.bulk_create([
+                    Follow(user=user, author_id=author_id)
+                    for author_id in new_ids
+                ])
+                followed_changed(user.id, new_ids, 1)
+                return new_ids
+        except IntegrityError:
+            if attempt == FOLLOW_ATTEMPTS:
+                raise
+
+
+@contextmanager
+def collect_unfollowed():
+    """Собирает id авторов подписок, удалённых внутри блока.
+
+    Сигнал post_delete в этом блоке только записывает автора,
+    а побочные эффекты делает followed_changed сразу для всех.
+    """
+    _local.unfollowed = []
+    try:
+        yield _local.unfollowed
+    finally:
+        _local.unfollowed = None
+
+
+def unfollowed(follow):
+    """Записывает удалённую подписку, если идёт пакетная отписка."""
+    collected = getattr(_local, 'unfollowed', None)
+    if collected is None:
+        return False
+    collected.append(follow.author_id)
+    return True
+
+
+def unfollow_authors(user, author_ids):
+    """Отписывает пользователя от авторов одним DELETE.
+
+    Возвращает id авторов, подписка на которых была удалена:
+    счётчики меняются по строкам, которые удалил сам DELETE.
+    """
+    with transaction.atomic(), collect_unfollowed() as removed:
+        Follow.objects.filter(user=user, author_id__in=author_ids).delete()
+        removed_ids = sorted(removed)
+        if removed_ids:
+            followed_changed(user.id, removed_ids, -1)
+    return removed_ids
@@ -1,5 +1,7 @@
 from django import forms
+from django.db import transaction
 
+from . import thumbnails
 from .models import Comment, Post
 
 
@@ -16,6 +18,15 @@ class PostForm(forms.ModelForm):
             'group': 'Выберите группу'
         }
 
+    def save(self, commit=True):
+        post = super().save(commit)
+        if 'image' in self.changed_data:
+            # При commit=False пост сохраняет view, поэтому картинка
+            # уменьшается, очищается от метаданных и получает миниатюры
+            # в фоне только после фиксации транзакции.
+            transaction.on_commit(lambda: thumbnails.schedule(post))
+        return post
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,51 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+PAGE_PARAMS = ('page', 'before', 'after')
+
+
+def generation_keys(feed_keys):
+    return [f'{key}:gen' for key in feed_keys]
+
+
+def get_generations(feed_keys):
+    keys = generation_keys(feed_keys)
+    generations = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, None)
+        generations.update(missing)
+    return [generations[key] for key in keys]
+
+
+def bump_generations(feed_keys):
+    """Сбрасывает кэш фрагментов затронутых лент.
+
+    Поколение — случайная метка, а не счётчик: после вытеснения ключа
+    из кэша новое поколение не совпадёт со старыми фрагментами.
+    """
+    cache.set_many({key: uuid4().hex for key in generation_keys(feed_keys)},
+                   None)
+
+
+def fragment_context(request, feed_keys, viewer=None):
+    """Ключ и время жизни фрагмента страницы ленты.
+
+    Ключ складывается из поколений лент, зрителя и номера страницы.
+    В общей странице с дырками от зрителя фрагмент не зависит.
+    """
+    parts = get_generations(feed_keys)
+    if getattr(request, 'punch_holes', False):
+        parts.append('holes')
+    elif viewer is not None:
+        parts.append(str(viewer))
+    parts.extend(
+        f'{param}={request.GET[param]}' for param in PAGE_PARAMS
+        if param in request.GET
+    )
+    return {
+        'fragment_key': ':'.join(parts),
+        'fragment_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
@@ -0,0 +1,59 @@
+import json
+import re
+
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .follows import get_following
+from .forms import CommentForm
+
+HOLE_RE = re.compile(r'<!--hole:(\w+) (\{.*?\})-->')
+
+
+def follow_context(request, author_id, username):
+    user = request.user
+    return {
+        'following': (user.is_authenticated
+                      and author_id in get_following(user.id)),
+    }
+
+
+def comment_context(request, post_id):
+    return {'form': CommentForm()}
+
+
+# Части страниц, которые зависят от зрителя: шаблон и функция,
+# добавляющая в контекст данные пользователя. Аргументы дырки
+# попадают в маркер, поэтому должны сериализоваться в JSON.
+HOLES = {
+    'header': ('includes/header.html', None),
+    'switcher': ('posts/includes/switcher.html', None),
+    'edit_button': ('posts/includes/edit_button.html', None),
+    'follow_button': ('posts/includes/follow_button.html', follow_context),
+    'comment_form': ('posts/includes/comment_form.html', comment_context),
+}
+
+
+def hole_context(request, name, kwargs):
+    template_name, context_func = HOLES[name]
+    context = dict(kwargs)
+    if context_func is not None:
+        context.update(context_func(request, **kwargs))
+    return template_name, context
+
+
+def marker(name, kwargs):
+    return mark_safe(
+        f'<!--hole:{name} {json.dumps(kwargs, sort_keys=True)}-->'
+    )
+
+
+def fill(request, content):
+    """Заменяет маркеры в общей странице на части для зрителя."""
+    def render(match):
+        template_name, context = hole_context(
+            request, match[1], json.loads(match[2])
+        )
+        return render_to_string(template_name, context, request)
+
+    return HOLE_RE.sub(render, content)
@@ -0,0 +1,92 @@
+import mimetypes
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from PIL import Image, ImageOps
+
+# Ключи Image.info, которые не должны попасть в сохранённый файл.
+METADATA = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment', 'photoshop')
+
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 85},
+    'GIF': {},
+}
+
+
+def needs_ingest(image):
+    max_width, max_height = settings.IMAGE_MAX_SIZE
+    if image.width > max_width or image.height > max_height:
+        return True
+    if any(key in image.info for key in METADATA):
+        return True
+    return bool(getattr(image, 'text', None))
+
+
+def ingest(content):
+    """Готовит сохранённую картинку к раздаче.
+
+    Поворачивает её по EXIF, уменьшает до IMAGE_MAX_SIZE и сохраняет
+    заново без метаданных, но с цветовым профилем и прозрачностью.
+    Анимацию, неизвестные форматы и картинки, которым нечего убирать,
+    возвращает без изменений.
+    """
+    content.seek(0)
+    image = Image.open(content)
+    if (image.format not in SAVE_OPTIONS
+            or getattr(image, 'is_animated', False)
+            or not needs_ingest(image)):
+        content.seek(0)
+        return content
+    image_format = image.format
+    # Эти ключи Image.info нужно передать save() явно.
+    kept = {
+        key: image.info[key]
+        for key in ('icc_profile', 'transparency') if key in image.info
+    }
+    # JPEG можно декодировать сразу в уменьшенном масштабе.
+    image.draft(None, settings.IMAGE_MAX_SIZE)
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(settings.IMAGE_MAX_SIZE, Image.LANCZOS)
+    image.info = {}
+    options = dict(SAVE_OPTIONS[image_format], **kept)
+    output = BytesIO()
+    image.save(output, image_format, **options)
+    return ContentFile(output.getvalue(), name=content.name)
+
+
+def can_encode(image_format):
+    Image.init()
+    return image_format.upper() in Image.SAVE
+
+
+def save_variants(storage, name):
+    """Создаёт рядом с миниатюрой её копии в форматах IMAGE_VARIANTS.
+
+    Возвращает пары (MIME-тип, адрес) вместе с исходным файлом,
+    от меньшего к большему. Форматы, которые эта сборка Pillow
+    не умеет кодировать, пропускаются.
+    """
+    sizes = [(storage.size(name), mimetypes.guess_type(name)[0],
+              storage.url(name))]
+    base = os.path.splitext(name)[0]
+    image = None
+    for image_format, options in settings.IMAGE_VARIANTS.items():
+        if not can_encode(image_format):
+            continue
+        variant = f'{base}.{image_format}'
+        if not storage.exists(variant):
+            if image is None:
+                with storage.open(name) as source:
+                    image = Image.open(source)
+                    image.load()
+            output = BytesIO()
+            image.save(output, image_format.upper(), **options)
+            storage.save(variant, ContentFile(output.getvalue()))
+        sizes.append((storage.size(variant), f'image/{image_format}',
+                      storage.url(variant)))
+    return [(mime, url) for _, mime, url in sorted(sizes)]
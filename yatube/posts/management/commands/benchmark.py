@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный замер страниц posts на сгенерированных данных '
+            'в отдельной тестовой базе')
+
+    def add_arguments(self, parser):
+        for name, default in benchmark.DATASET.items():
+            parser.add_argument(
+                f'--{name}', type=int, default=default,
+                help=f'Сколько создать ({default} по умолчанию)'
+            )
+        parser.add_argument(
+            '--requests', type=int, default=20,
+            help='Запросов к каждому адресу'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом'
+        )
+        parser.add_argument(
+            '--locmem', action='store_true',
+            help='LocMemCache вместо кэша из settings'
+        )
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='Файл для результатов в JSON'
+        )
+        parser.add_argument(
+            '--compare', help='Результаты прошлого запуска для сравнения'
+        )
+
+    def handle(self, *args, **options):
+        dataset = {name: options[name] for name in benchmark.DATASET}
+        settings_dict = connection.settings_dict
+        old_name = settings_dict['NAME']
+        saved_test = settings_dict['TEST']
+        media_root = tempfile.mkdtemp()
+        # Данные, картинки и кэш живут только на время замера. База
+        # в файле, а не в памяти, как у тестов: замер должен учитывать
+        # журнал WAL и синхронизацию с диском.
+        settings_dict['TEST'] = dict(
+            saved_test, NAME=os.path.join(media_root, 'db.sqlite3')
+        )
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with override_settings(
+                MEDIA_ROOT=media_root, THUMBNAIL_WORKERS=0
+            ), benchmark.benchmark_caches(options['locmem']):
+                self.stdout.write(f'Создаём данные: {dataset}')
+                viewer = benchmark.seed(seed=options['seed'], **dataset)
+                views = benchmark.measure(
+                    viewer, options['requests'],
+                    seed=options['seed'], cold=options['cold']
+                )
+                result = benchmark.report(
+                    dataset, views, options['requests'],
+                    options['seed'], options['cold']
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            settings_dict['TEST'] = saved_test
+            shutil.rmtree(media_root, ignore_errors=True)
+        with open(options['output'], 'w') as output:
+            json.dump(result, output, ensure_ascii=False, indent=2)
+        for name, stats in views.items():
+            self.stdout.write(
+                f'{name}: p50 {stats["p50_ms"]} мс, p95 {stats["p95_ms"]} мс, '
+                f'p99 {stats["p99_ms"]} мс, запросов {stats["queries_max"]}, '
+                f'{stats["bytes_mean"]} байт'
+            )
+        if options['compare']:
+            with open(options['compare']) as old:
+                for line in benchmark.compare(json.load(old), result):
+                    self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты сохранены в {options["output"]}'
+        ))
@@ -0,0 +1,95 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts import benchmark
+
+# Настройки SQLite по умолчанию, с которыми сравнивается рабочий профиль.
+DEFAULT_PROFILE = {'OPTIONS': {}, 'CONN_MAX_AGE': 0}
+
+
+class Command(BaseCommand):
+    help = ('Замер чтения лент при одновременной записи комментариев '
+            'и постов: SQLite по умолчанию против рабочего профиля')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Секунд на каждый профиль'
+        )
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--locmem', action='store_true',
+            help='LocMemCache вместо кэша из settings'
+        )
+        parser.add_argument(
+            '--output', default='benchmark_concurrency.json',
+            help='Файл для результатов в JSON'
+        )
+
+    def handle(self, *args, **options):
+        profiles = {
+            'default': DEFAULT_PROFILE,
+            'production': {
+                key: connection.settings_dict[key]
+                for key in DEFAULT_PROFILE
+            },
+        }
+        result = {}
+        for name, profile in profiles.items():
+            result[name] = self.run_profile(profile, options)
+            for kind, stats in result[name].items():
+                self.stdout.write(
+                    f'{name} {kind}: {stats["per_second"]} запросов/с, '
+                    f'p50 {stats["p50_ms"]} мс, p99 {stats["p99_ms"]} мс, '
+                    f'ошибок {stats["errors"]}'
+                )
+        with open(options['output'], 'w') as output:
+            json.dump(result, output, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты сохранены в {options["output"]}'
+        ))
+
+    def run_profile(self, profile, options):
+        # Потокам нужна общая база в файле: база в памяти тестов
+        # блокирует таблицы целиком и не поддерживает WAL.
+        settings_dict = connection.settings_dict
+        saved = {key: settings_dict[key] for key in ('TEST', *profile)}
+        directory = tempfile.mkdtemp()
+        settings_dict['TEST'] = dict(
+            saved['TEST'], NAME=os.path.join(directory, 'db.sqlite3')
+        )
+        settings_dict.update(profile)
+        old_name = settings_dict['NAME']
+        try:
+            with override_settings(
+                THUMBNAIL_WORKERS=0
+            ), benchmark.benchmark_caches(options['locmem']):
+                connection.creation.create_test_db(
+                    verbosity=0, autoclobber=True, serialize=False
+                )
+                try:
+                    benchmark.seed(
+                        users=options['users'], groups=5,
+                        posts=options['posts'], follows=options['users'],
+                        comments=options['posts'], images=0,
+                        seed=options['seed']
+                    )
+                    return benchmark.concurrency(
+                        options['readers'], options['writers'],
+                        options['duration'], seed=options['seed']
+                    )
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            settings_dict.update(saved)
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,29 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from posts.media import dedupe
+
+
+class Command(BaseCommand):
+    help = 'Переименовывает картинки постов по хешу и удаляет дубли'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать дубли, ничего не меняя'
+        )
+
+    def handle(self, *args, **options):
+        files, duplicates, saved, posts = dedupe(dry_run=options['dry_run'])
+        if not options['dry_run']:
+            # Закэшированные страницы ссылаются на старые имена файлов.
+            cache.clear()
+        action = 'Найдено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            f'Файлов со старыми именами: {files}. {action} дублей: '
+            f'{duplicates}, {saved / 1024:.1f} КБ. Постов: {posts}'
+        )
+        if files and not options['dry_run']:
+            self.stdout.write(
+                'Миниатюры для новых имён создаст manage.py warm_thumbnails'
+            )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import repair
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики постов, комментариев и подписок с данными'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только показать расхождения, ничего не исправляя'
+        )
+
+    def handle(self, *args, **options):
+        users, posts = repair(dry_run=options['check'])
+        action = 'Расходятся' if options['check'] else 'Исправлены'
+        self.stdout.write(
+            f'{action} счётчики пользователей: {users}, постов: {posts}'
+        )
@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import missing_renditions, render_urls
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число процессов (по умолчанию — число ядер, 0 — без пула)'
+        )
+        parser.add_argument(
+            '--state',
+            default=os.path.join(settings.BASE_DIR, '.warm_thumbnails'),
+            help='Файл с уже обработанными картинками'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Пропустить картинки, обработанные прошлым запуском'
+        )
+
+    def handle(self, *args, **options):
+        done = set()
+        if options['resume'] and os.path.exists(options['state']):
+            with open(options['state']) as state:
+                done = set(state.read().split('\n'))
+        names = sorted(
+            set(
+                Post.objects.exclude(image='').values_list(
+                    'image', flat=True
+                )
+            ) - done
+        )
+        missing = [name for name in names if missing_renditions(name)]
+        self.stdout.write(
+            f'Картинок: {len(names)}, без миниатюр: {len(missing)}'
+        )
+        # Картинки с готовыми миниатюрами только отмечаются в состоянии.
+        warm = sorted(set(names) - set(missing))
+        started = time.monotonic()
+        failed = 0
+        mode = 'a' if options['resume'] else 'w'
+        with open(options['state'], mode) as state:
+            state.writelines(name + '\n' for name in warm)
+            for number, (name, urls) in enumerate(
+                self.render(missing, options['workers']), 1
+            ):
+                if urls is None:
+                    failed += 1
+                else:
+                    cache.set_many(urls, None)
+                    state.write(name + '\n')
+                if number % 50 == 0 or number == len(missing):
+                    self.stdout.write(
+                        self.progress(number, len(missing), started)
+                    )
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {len(missing) - failed}, ошибок: {failed}. '
+            + self.progress(len(missing), len(missing), started)
+        ))
+
+    @staticmethod
+    def render(names, workers):
+        if not workers:
+            for name in names:
+                yield name, render_urls(name)
+            return
+        # spawn есть на всех платформах, поэтому процессы настраивают
+        # Django сами, а не получают его состояние через fork.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup
+        ) as pool:
+            futures = {pool.submit(render_urls, name): name for name in names}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    @staticmethod
+    def progress(number, total, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        return f'{number}/{total}, {number / elapsed:.1f} картинок/с'
@@ -0,0 +1,101 @@
+import logging
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from sorl.thumbnail import default
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post
+from .storage import content_name
+from .thumbnails import image_storage, rendition_name, sources_key, url_key
+
+logger = logging.getLogger(__name__)
+
+
+def is_referenced(name):
+    """Ссылается ли на файл картинки хотя бы один пост."""
+    return Post.objects.filter(image=name).exists()
+
+
+def delete_renditions(name, storage=None):
+    """Удаляет миниатюры картинки, их сжатые копии и адреса в кэше."""
+    storage = storage or image_storage()
+    for rendition, (geometry, options) in settings.POST_THUMBNAILS.items():
+        thumbnail_name = rendition_name(name, geometry, options, storage)
+        base = os.path.splitext(thumbnail_name)[0]
+        for image_format in settings.IMAGE_VARIANTS:
+            default.storage.delete(f'{base}.{image_format}')
+        default.storage.delete(thumbnail_name)
+        cache.delete_many([url_key(name, rendition),
+                           sources_key(name, rendition)])
+    delete_thumbnails(ImageFile(name, storage), delete_file=False)
+
+
+def release(name):
+    """Удаляет файл картинки, если на него больше не ссылается
+    ни один пост. Возвращает True, если файл удалён.
+
+    Проверка ссылок и удаление идут в одной транзакции. С BEGIN
+    IMMEDIATE она ждёт блокировку записи и не пересекается с загрузкой:
+    сохранение файла и поста со ссылкой на него тоже идут в одной
+    транзакции. Иначе хранилище могло бы найти файл, который сейчас
+    будет удалён, и не записать его заново.
+    """
+    if not name:
+        return False
+    # Вызывается после фиксации транзакции: ошибка здесь не должна
+    # превращать уже выполненный запрос в ответ 500.
+    try:
+        with transaction.atomic():
+            if is_referenced(name):
+                return False
+            delete_renditions(name)
+            image_storage().delete(name)
+    except Exception:
+        logger.exception('Ошибка при удалении картинки %s', name)
+        return False
+    return True
+
+
+def dedupe(directory='posts', dry_run=False, legacy_storage=None):
+    """Переименовывает файлы каталога по хешу содержимого.
+
+    Одинаковые файлы сводятся к одному, посты переводятся на новые
+    имена, миниатюры старых имён удаляются. legacy_storage — хранилище,
+    с которым создавались эти миниатюры, от него зависят их имена.
+    Возвращает число обработанных файлов, удалённых дублей,
+    освобождённых байт и изменённых постов.
+    """
+    storage = image_storage()
+    legacy_storage = legacy_storage or default_storage
+    files = duplicates = saved = posts = 0
+    if not storage.exists(directory):
+        return files, duplicates, saved, posts
+    targets = set()
+    for filename in sorted(storage.listdir(directory)[1]):
+        name = f'{directory}/{filename}'
+        with storage.open(name) as content:
+            target = content_name(name, content)
+            if target == name:
+                targets.add(target)
+                continue
+            files += 1
+            duplicate = target in targets or storage.exists(target)
+            targets.add(target)
+            if duplicate:
+                duplicates += 1
+                saved += storage.size(name)
+            if dry_run:
+                posts += Post.objects.filter(image=name).count()
+                continue
+            if not duplicate:
+                storage.save(target, content)
+        posts += Post.objects.filter(image=name).update(image=target)
+        delete_renditions(name, legacy_storage)
+        storage.delete(name)
+    return files, duplicates, saved, posts
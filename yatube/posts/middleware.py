@@ -0,0 +1,187 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+from . import holes
+from .etags import group_etag, index_etag, post_etag, profile_etag
+
+# Страницы, которые гости получают из кэша, и функции их ETag.
+# ETag складывается из поколений лент, поэтому запись поста,
+# комментария или группы меняет ключ и старая копия не отдаётся.
+PAGES = {
+    'posts:index': index_etag,
+    'posts:group_list': group_etag,
+    'posts:profile': profile_etag,
+    'posts:post_detail': post_etag,
+}
+
+# Сколько секунд страница с ответом не 200 или с Set-Cookie
+# отдаётся мимо кэша.
+UNCACHEABLE_TIMEOUT = 60
+
+# Заголовки запроса, с которыми view может ответить 304 вместо страницы.
+CONDITIONAL_HEADERS = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+
+
+def page_key(request, etag):
+    return f'page:{request.path}:{etag}'
+
+
+def page_view(request):
+    """Функция ETag и аргументы кэшируемой страницы или None."""
+    if request.method != 'GET':
+        return None
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return None
+    # Ответ из кэша минует view: имя адреса нужно метрикам запроса.
+    request.resolver_match = match
+    etag_func = PAGES.get(match.view_name)
+    if etag_func is None:
+        return None
+    return etag_func, match.args, match.kwargs
+
+
+def page_entry(response):
+    """Тело и заголовки ответа для кэша или False, если он не кэшируется."""
+    if response.status_code != 200 or response.cookies or response.streaming:
+        return False
+    return response.content, [
+        (name, value) for name, value in response.items()
+        if name.lower() != 'set-cookie'
+    ]
+
+
+def page_response(content, headers):
+    response = HttpResponse(content)
+    for name, value in headers:
+        response[name] = value
+    return response
+
+
+class PageCacheMiddleware:
+    """Общая часть кэшей страниц: отрисовка промаха и ответ из кэша."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def render(self, request):
+        """Полная страница: без условных заголовков запроса view
+        не ответит 304, и такой ответ не попадёт в кэш как
+        «не кэшируется». 304 дают потом из полной страницы."""
+        conditional = {
+            name: request.META.pop(name)
+            for name in CONDITIONAL_HEADERS if name in request.META
+        }
+        try:
+            return self.get_response(request)
+        finally:
+            request.META.update(conditional)
+
+    def fetch(self, request, key):
+        """Отрисованный здесь ответ (или None) и запись кэша страницы."""
+        response = None
+
+        def render():
+            nonlocal response
+            response = self.render(request)
+            return page_entry(response)
+
+        entry = cache.get_or_set(key, render, settings.PAGE_CACHE_TIMEOUT)
+        if response is not None and entry is False:
+            # Отметка «не кэшируется», чтобы следующие запросы
+            # не ждали чужой отрисовки.
+            cache.set(key, False, UNCACHEABLE_TIMEOUT)
+        return response, entry
+
+    def finish(self, request, response):
+        patch_vary_headers(response, ('Cookie',))
+        not_modified = get_conditional_response(
+            request, etag=response.get('ETag'), response=response
+        )
+        if not_modified is not None and not_modified is not response:
+            return not_modified
+        return self.complete(request, response)
+
+    def complete(self, request, response):
+        return response
+
+
+class AnonymousPageCacheMiddleware(PageCacheMiddleware):
+    """Готовые страницы лент для гостей без cookies.
+
+    Стоит до сессий и авторизации: запрос без единой cookie
+    не может принадлежать пользователю, поэтому ответ из кэша
+    отдаётся без обращений к базе. Сохраняются только ответы 200
+    без Set-Cookie, и у всех ответов этих страниц есть Vary: Cookie.
+    """
+
+    def __call__(self, request):
+        etag = self.page_etag(request)
+        if etag is None:
+            return self.get_response(request)
+        response, entry = self.fetch(request, page_key(request, etag))
+        if response is not None:
+            return self.finish(request, response)
+        if entry is False:
+            return self.get_response(request)
+        return self.finish(request, page_response(*entry))
+
+    @staticmethod
+    def page_etag(request):
+        view = None if request.COOKIES else page_view(request)
+        if view is None:
+            return None
+        etag_func, args, kwargs = view
+        return etag_func(request, *args, **kwargs)
+
+
+class HolePunchPageCacheMiddleware(PageCacheMiddleware):
+    """Общие страницы лент для пользователей, вошедших на сайт.
+
+    Страница отрисовывается один раз на поколение ленты, и вместо
+    частей, зависящих от зрителя, в ней стоят маркеры posts.holes.
+    Каждому пользователю отдаётся эта копия, в которой маркеры
+    заменены на части, отрисованные для него. Стоит после
+    AuthenticationMiddleware.
+    """
+
+    def __call__(self, request):
+        view = page_view(request)
+        if view is None or not request.user.is_authenticated:
+            return self.get_response(request)
+        etag_func, args, kwargs = view
+        shared_etag = etag_func(request, *args, shared=True, **kwargs)
+        if shared_etag is None:
+            return self.get_response(request)
+        response, entry = self.fetch(
+            request, page_key(request, f'holes:{shared_etag}')
+        )
+        if response is not None:
+            return self.finish(request, response)
+        if entry is False:
+            return self.get_response(request)
+        response = page_response(*entry)
+        # В записи ETag того, кто отрисовал страницу.
+        response['ETag'] = quote_etag(etag_func(request, *args, **kwargs))
+        return self.finish(request, response)
+
+    def render(self, request):
+        request.punch_holes = True
+        try:
+            return super().render(request)
+        finally:
+            request.punch_holes = False
+
+    def complete(self, request, response):
+        # Маркеры есть и в ответах, не попавших в кэш,
+        # например в странице 404.
+        if not response.streaming:
+            response.content = holes.fill(request, response.content.decode())
+            if response.has_header('Content-Length'):
+                response['Content-Length'] = len(response.content)
+        return response
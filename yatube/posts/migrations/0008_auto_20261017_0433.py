@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-17 04:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    UserCounter = apps.get_model('posts', 'UserCounter')
+    counters = {}
+    for user_id in User.objects.values_list('id', flat=True):
+        counters[user_id] = UserCounter(user_id=user_id)
+    for field, name, model in (
+        ('author', 'posts', Post),
+        ('author', 'followers', apps.get_model('posts', 'Follow')),
+        ('user', 'following', apps.get_model('posts', 'Follow')),
+    ):
+        totals = model.objects.order_by().values_list(field).annotate(
+            total=models.Count('id')
+        )
+        for user_id, total in totals:
+            setattr(counters[user_id], name, total)
+    UserCounter.objects.bulk_create(counters.values(), batch_size=500)
+    totals = apps.get_model('posts', 'Comment').objects.order_by(
+    ).values_list('post').annotate(total=models.Count('id'))
+    for post_id, total in totals:
+        Post.objects.filter(pk=post_id).update(comments_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0007_auto_20261017_0429'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts', models.PositiveIntegerField(default=0)),
+                ('followers', models.PositiveIntegerField(default=0)),
+                ('following', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
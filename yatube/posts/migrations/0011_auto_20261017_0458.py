@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-17 04:58
+
+from django.db import migrations, models
+import posts.storage
+
+from posts.fts import TRIGGERS_SQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_auto_20261017_0453'),
+    ]
+
+    operations = [
+        migrations.RunSQL(migrations.RunSQL.noop, TRIGGERS_SQL),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunSQL(TRIGGERS_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-17 05:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+from posts.fts import TRIGGERS_SQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_auto_20261017_0458'),
+    ]
+
+    operations = [
+        migrations.RunSQL(migrations.RunSQL.noop, TRIGGERS_SQL),
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.RunSQL(TRIGGERS_SQL, migrations.RunSQL.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -16,36 +18,55 @@ class Group(models.Model):
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
+    # Отдельные индексы не нужны: author и group стоят первыми
+    # в составных индексах лент.
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='posts'
+        related_name='posts',
+        db_index=False
     )
     group = models.ForeignKey(
         Group,
         on_delete=models.SET_NULL,
         related_name='posts',
         blank=True,
-        null=True
+        null=True,
+        db_index=False
     )
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=ContentAddressedStorage(),
+        blank=True,
+        db_index=True
     )
+    comments_count = models.PositiveIntegerField(default=0)
+    # Меняется при каждом save() и входит в ключ кэша карточки поста.
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = (
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_date_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
 
 
 class Comment(models.Model):
+    # Индекс по post — первый столбец comment_post_created_idx.
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
-        related_name='comments'
+        related_name='comments',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
@@ -57,21 +78,29 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = (
+            models.Index(fields=['post', '-created', '-id'],
+                         name='comment_post_created_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
 
 
 class Follow(models.Model):
+    # Индекс по user — первый столбец уникального индекса uniq_follow.
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='follower'
+        related_name='follower',
+        db_index=False
     )
+    # Индекс по author — первый столбец follow_author_user_idx.
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='following'
+        related_name='following',
+        db_index=False
     )
 
     class Meta:
@@ -79,3 +108,51 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='uniq_follow'),
         )
+        indexes = (
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        )
+
+
+class Timeline(models.Model):
+    """Лента подписок, заполняемая при публикации поста."""
+    # Индекс по user — первый столбец timeline_user_date_idx.
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        db_index=False
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date', '-id']
+        constraints = (
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='uniq_timeline'),
+        )
+        indexes = (
+            models.Index(fields=['user', '-pub_date', '-id'],
+                         name='timeline_user_date_idx'),
+        )
+
+
+class UserCounter(models.Model):
+    """Счётчики постов и подписок пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counter'
+    )
+    posts = models.PositiveIntegerField(default=0)
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.user)
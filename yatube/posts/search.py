@@ -0,0 +1,77 @@
+from django.db import connection
+
+from .models import Post
+
+MATCH_WHERE = (
+    'posts_post.id IN '
+    '(SELECT rowid FROM posts_post_fts WHERE posts_post_fts MATCH %s)'
+)
+
+
+def match_expression(query):
+    """Превращает введённый текст в запрос FTS5 из слов-фраз.
+
+    Кавычки экранируются, поэтому операторы FTS5 во вводе
+    не вызывают синтаксических ошибок.
+    """
+    words = ['"{}"'.format(word.replace('"', '""'))
+             for word in query.split()]
+    return ' '.join(words)
+
+
+def filter_matching(queryset, query):
+    """Оставляет в queryset постов только подходящие под запрос."""
+    return queryset.extra(
+        where=[MATCH_WHERE], params=[match_expression(query)]
+    )
+
+
+def encode_cursor(rank, post_id):
+    return f'{rank!r}_{post_id}'
+
+
+def decode_cursor(cursor):
+    try:
+        rank, post_id = (cursor or '').split('_')
+        return float(rank), int(post_id)
+    except ValueError:
+        return None
+
+
+def search_posts(query, per_page, group=None, author=None, after=None):
+    """Ищет посты по индексу FTS5 и сортирует их по релевантности (bm25).
+
+    Возвращает страницу постов и курсор следующей страницы или None.
+    """
+    match = match_expression(query)
+    if not match:
+        return [], None
+    sql = [
+        'SELECT p.id, f.rank FROM posts_post_fts f',
+        'JOIN posts_post p ON p.id = f.rowid',
+        'WHERE posts_post_fts MATCH %s',
+    ]
+    params = [match]
+    if group is not None:
+        sql.append('AND p.group_id = %s')
+        params.append(group.id)
+    if author is not None:
+        sql.append('AND p.author_id = %s')
+        params.append(author.id)
+    cursor_key = decode_cursor(after)
+    if cursor_key is not None:
+        sql.append('AND (f.rank > %s OR (f.rank = %s AND p.id > %s))')
+        params.extend([cursor_key[0], cursor_key[0], cursor_key[1]])
+    sql.append('ORDER BY f.rank, p.id LIMIT %s')
+    params.append(per_page + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [post_id for post_id, _ in rows]
+    )
+    return [posts[post_id] for post_id, _ in rows], next_cursor
@@ -0,0 +1,234 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import media, timeline
+from .counters import change_comments_count, change_user_counter
+from .counts import (change_feed_counts, feed_key, post_feed_keys,
+                     reset_feed_counts)
+from .etags import (group_lookup_key, post_author_lookup_key, post_key,
+                    profile_key, user_lookup_key)
+from .follows import forget_following, unfollowed
+from .fragments import bump_generations
+from .models import Comment, Follow, Group, Post, User, UserCounter
+
+
+def follower_keys(user_ids):
+    return [feed_key('follower', user_id) for user_id in user_ids]
+
+
+# Поля пользователя, которые выводятся в карточках его постов.
+AUTHOR_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def saved_values(sender, instance, fields, update_fields=None):
+    """Значения полей в базе до сохранения объекта.
+
+    Если сохраняются другие поля (например, last_login при входе),
+    эти поля не меняются и запрос не нужен.
+    """
+    if instance.pk is None:
+        return None
+    if update_fields is not None and not set(fields) & set(update_fields):
+        return tuple(getattr(instance, field) for field in fields)
+    return sender.objects.filter(pk=instance.pk).values_list(
+        *fields
+    ).first()
+
+
+@receiver(pre_save, sender=User)
+def remember_names(sender, instance, update_fields=None, **kwargs):
+    instance._saved_names = saved_values(
+        sender, instance, AUTHOR_NAME_FIELDS, update_fields
+    )
+
+
+def author_renamed(author):
+    """Сбрасывает карточки и страницы лент с постами автора
+    и страницы постов с его комментариями."""
+    posts = author.posts.order_by()
+    posts.update(updated=timezone.now())
+    group_ids = posts.exclude(group=None).values_list(
+        'group_id', flat=True
+    ).distinct()
+    commented_ids = Comment.objects.filter(author=author).order_by(
+    ).values_list('post_id', flat=True).distinct()
+    bump_generations(
+        [feed_key('global'), feed_key('author', author.pk),
+         profile_key(author.pk)]
+        + [feed_key('group', group_id) for group_id in group_ids]
+        + follower_keys(author.following.values_list('user_id', flat=True))
+        + [post_key(post_id) for post_id in commented_ids]
+    )
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    if created:
+        UserCounter.objects.create(user=instance)
+    saved = instance._saved_names
+    names = tuple(getattr(instance, field) for field in AUTHOR_NAME_FIELDS)
+    if saved is not None and saved != names:
+        author_renamed(instance)
+    # ETag профиля ищет пользователя по имени из адреса.
+    cache.delete_many([
+        user_lookup_key(username)
+        for username in {saved and saved[0], instance.username}
+        if username
+    ])
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    cache.delete(user_lookup_key(instance.username))
+
+
+@receiver(pre_save, sender=Post)
+def remember_saved(sender, instance, **kwargs):
+    instance._saved_group_id = None
+    instance._saved_image = ''
+    if instance.pk is not None:
+        instance._saved_group_id, instance._saved_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image'
+            ).first() or (None, '')
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        change_user_counter(instance.author_id, posts=1)
+        keys = post_feed_keys(instance) + follower_keys(
+            timeline.fan_out(instance) or []
+        )
+        change_feed_counts(keys, 1)
+        bump_generations(keys)
+        return
+    old_group_id = instance._saved_group_id
+    if instance._saved_image != (instance.image.name or ''):
+        # Файл может быть общим с другими постами: удаляем его только
+        # после фиксации, когда ссылок на него не останется.
+        transaction.on_commit(partial(media.release, instance._saved_image))
+    keys = post_feed_keys(instance) + follower_keys(
+        instance.timeline.values_list('user_id', flat=True)
+    ) + [post_key(instance.pk)]
+    if old_group_id != instance.group_id:
+        if old_group_id:
+            change_feed_counts([feed_key('group', old_group_id)], -1)
+            keys.append(feed_key('group', old_group_id))
+        if instance.group_id:
+            change_feed_counts([feed_key('group', instance.group_id)], 1)
+    bump_generations(keys)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_timeline(sender, instance, **kwargs):
+    instance._timeline_users = list(
+        instance.timeline.values_list('user_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change_user_counter(instance.author_id, create=False, posts=-1)
+    keys = post_feed_keys(instance) + follower_keys(
+        instance._timeline_users
+    )
+    change_feed_counts(keys, -1)
+    bump_generations(keys + [post_key(instance.pk)])
+    cache.delete(post_author_lookup_key(instance.pk))
+    if instance.image:
+        transaction.on_commit(partial(media.release, instance.image.name))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        change_user_counter(instance.author_id, followers=1)
+        change_user_counter(instance.user_id, following=1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        forget_following(instance.user_id)
+        keys = follower_keys([instance.user_id])
+        reset_feed_counts(keys)
+        bump_generations(keys + [
+            profile_key(instance.user_id), profile_key(instance.author_id)
+        ])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    if unfollowed(instance):
+        return
+    change_user_counter(instance.author_id, create=False, followers=-1)
+    change_user_counter(instance.user_id, create=False, following=-1)
+    timeline.remove(instance.user_id, instance.author_id)
+    forget_following(instance.user_id)
+    keys = follower_keys([instance.user_id])
+    reset_feed_counts(keys)
+    bump_generations(keys + [
+        profile_key(instance.user_id), profile_key(instance.author_id)
+    ])
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        change_comments_count(instance.post_id, 1)
+        bump_generations([post_key(instance.post_id)])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    change_comments_count(instance.post_id, -1)
+    bump_generations([post_key(instance.post_id)])
+
+
+@receiver(pre_save, sender=Group)
+def remember_slug(sender, instance, update_fields=None, **kwargs):
+    saved = saved_values(sender, instance, ('slug',), update_fields)
+    instance._saved_slug = saved and saved[0]
+
+
+def group_changed(group):
+    """Сбрасывает карточки постов группы и возвращает ключи лент,
+    в которых они выводятся."""
+    # Название группы выводится в карточках постов на главной,
+    # в профилях авторов и на страницах постов.
+    author_ids = list(group.posts.order_by().values_list(
+        'author_id', flat=True
+    ).distinct())
+    # Ссылка на группу есть в карточке каждого её поста.
+    group.posts.update(updated=timezone.now())
+    return (
+        [feed_key('group', group.pk), feed_key('global')]
+        + [feed_key('author', author_id) for author_id in author_ids]
+    )
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    cache.delete_many([
+        group_lookup_key(slug)
+        for slug in {instance._saved_slug, instance.slug}
+        if slug is not None
+    ])
+    if not created:
+        bump_generations(group_changed(instance))
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_posts(sender, instance, **kwargs):
+    # Посты отвязываются от группы одним UPDATE без сигналов.
+    instance._feed_keys = group_changed(instance)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    cache.delete(group_lookup_key(instance.slug))
+    bump_generations(instance._feed_keys)
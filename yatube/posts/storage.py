@@ -0,0 +1,38 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_name(name, content):
+    """Имя файла по SHA-256 содержимого в каталоге исходного имени."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    directory, filename = os.path.split(name)
+    extension = os.path.splitext(filename)[1].lower()
+    return os.path.join(directory, digest.hexdigest() + extension)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, называющее файлы по хешу содержимого.
+
+    Одинаковые загрузки получают одно имя и хранятся один раз.
+    Файл может принадлежать нескольким постам, поэтому удаляется
+    только через posts.media.release, когда ссылок на него не осталось.
+    Сохранять файл нужно в той же транзакции, что и пост со ссылкой
+    на него: так release не удалит найденный здесь файл до записи поста.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        name = content_name(name, content)
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
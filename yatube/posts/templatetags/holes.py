@@ -0,0 +1,23 @@
+from django import template
+
+from posts import holes
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **kwargs):
+    """Часть страницы, зависящая от зрителя.
+
+    Обычно отрисовывается на месте, как include. Когда страница
+    готовится для общего кэша, вместо неё выводится маркер,
+    который middleware заменит для каждого пользователя.
+    """
+    request = context.get('request')
+    if getattr(request, 'punch_holes', False):
+        return holes.marker(name, kwargs)
+    template_name, values = holes.hole_context(request, name, kwargs)
+    with context.push(**values):
+        return context.template.engine.get_template(
+            template_name
+        ).render(context)
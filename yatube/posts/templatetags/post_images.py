@@ -0,0 +1,29 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail_url(post, rendition):
+    """Адрес готовой миниатюры картинки поста без обращения к sorl.
+
+    Если миниатюры ещё нет, ставит её создание в очередь и возвращает
+    пустую строку, чтобы шаблон показал заглушку.
+    """
+    if not post.image:
+        return ''
+    url = thumbnails.thumbnail_url(post.image, rendition)
+    if url is None:
+        thumbnails.schedule(post)
+        return ''
+    return url
+
+
+@register.filter
+def image_sources(post, rendition):
+    """Копии миниатюры в сжатых форматах для тега picture."""
+    if not post.image:
+        return []
+    return thumbnails.image_sources(post.image, rendition)
@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from posts import benchmark
+from posts.models import Comment, Follow, Post, User
+from posts.urls import urlpatterns
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class BenchmarkTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed(self):
+        """Набор данных создаётся нужного размера"""
+        viewer = benchmark.seed(
+            users=5, groups=2, posts=8, follows=6, comments=4, images=1
+        )
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 8)
+        self.assertEqual(Post.objects.exclude(image='').count(), 1)
+        self.assertEqual(Follow.objects.count(), 6)
+        self.assertEqual(Comment.objects.count(), 4)
+        self.assertTrue(Follow.objects.filter(user=viewer).exists())
+
+    def test_measure(self):
+        """Замер проходит по всем адресам posts и не меняет данные"""
+        viewer = benchmark.seed(
+            users=3, groups=1, posts=3, follows=2, comments=2, images=0
+        )
+        views = benchmark.measure(viewer, requests=2)
+        self.assertEqual(
+            set(views), {pattern.name for pattern in urlpatterns}
+        )
+        for name, stats in views.items():
+            with self.subTest(name=name):
+                self.assertEqual(stats['requests'], 2)
+                self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+                self.assertGreater(stats['queries_max'], 0)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(Follow.objects.count(), 2)
+
+    def test_percentile(self):
+        """Перцентили считаются по ближайшему рангу"""
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
+
+    def test_caches(self):
+        """Замер идёт на кэше из settings в отдельных файлах,
+        LocMemCache — только по флагу"""
+        configured = settings.CACHES['default']
+        with benchmark.benchmark_caches():
+            self.assertEqual(
+                settings.CACHES['default']['BACKEND'], configured['BACKEND']
+            )
+            self.assertNotEqual(
+                settings.CACHES['default']['LOCATION'],
+                configured['LOCATION']
+            )
+        with benchmark.benchmark_caches(locmem=True):
+            self.assertEqual(
+                settings.CACHES['default']['BACKEND'],
+                'core.cache.LocMemCache'
+            )
+        self.assertEqual(settings.CACHES['default'], configured)
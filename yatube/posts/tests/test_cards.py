@@ -0,0 +1,119 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.counts import feed_key
+from posts.fragments import bump_generations
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='Author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.first = Post.objects.create(
+            text='Первый пост', author=cls.author, group=cls.group
+        )
+        cls.second = Post.objects.create(
+            text='Второй пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def rendered_cards(self, url):
+        response = self.guest_client.get(url)
+        return [
+            template.name for template in response.templates
+        ].count('posts/includes/image.html')
+
+    def test_edit_renders_one_card(self):
+        """Правка поста отрисовывает заново только его карточку"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+        )
+        for url in urls:
+            self.assertEqual(self.rendered_cards(url), 2)
+        self.first.text = 'Изменённый пост'
+        self.first.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.rendered_cards(url), 1)
+                self.assertContains(
+                    self.guest_client.get(url), 'Изменённый пост'
+                )
+
+    def test_search_uses_cards(self):
+        """Поиск выводит те же карточки из кэша, что и главная"""
+        url = reverse('posts:search')
+        response = self.guest_client.get(url, {'q': 'пост'})
+        self.assertTemplateUsed(response, 'posts/includes/card.html')
+        self.assertContains(response, 'все записи группы')
+        self.assertEqual(self.rendered_cards(reverse('posts:index')), 0)
+        self.first.text = 'Изменённый пост'
+        self.first.save()
+        response = self.guest_client.get(url, {'q': 'изменённый'})
+        self.assertContains(response, 'Изменённый пост')
+
+    def test_card_key_uses_modification_time(self):
+        """update() без смены updated не меняет карточку"""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        Post.objects.filter(pk=self.first.pk).update(text='Тихая правка')
+        bump_generations([feed_key('global')])
+        self.assertNotContains(self.guest_client.get(url), 'Тихая правка')
+
+    def test_page_variants(self):
+        """Профиль выводит полное имя без ссылки на профиль,
+        лента группы — карточки без ссылки на группу"""
+        profile_url = reverse('posts:profile', kwargs={'username': 'Author'})
+        group_url = reverse(
+            'posts:group_list', kwargs={'slug': self.group.slug}
+        )
+        index = self.guest_client.get(reverse('posts:index'))
+        profile = self.guest_client.get(profile_url)
+        group = self.guest_client.get(group_url)
+        self.assertContains(index, f'href="{profile_url}"')
+        self.assertContains(index, f'href="{group_url}"')
+        self.assertContains(profile, 'Автор: Лев Толстой')
+        self.assertNotContains(profile, 'все посты пользователя')
+        self.assertContains(profile, 'все записи группы')
+        self.assertContains(group, 'все посты пользователя')
+        self.assertNotContains(group, 'все записи группы')
+
+    def test_author_rename_updates_cards(self):
+        """Смена имени автора обновляет его карточки во всех лентах"""
+        author = User.objects.create_user(username='OldName')
+        Post.objects.create(text='Пост автора', author=author)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'OldName'}),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        author.username = 'NewName'
+        author.first_name = 'Новое'
+        author.save()
+        self.assertContains(
+            self.guest_client.get(urls[0]), 'Автор: NewName'
+        )
+        self.assertContains(
+            self.guest_client.get(
+                reverse('posts:profile', kwargs={'username': 'NewName'})
+            ),
+            'Автор: Новое'
+        )
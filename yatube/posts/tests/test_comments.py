@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.guest_client = Client()
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.total = settings.COMMENTS_PER_PAGE * 2 + 3
+        for i in range(cls.total):
+            commenter = User.objects.create_user(username=f'Reader{i}')
+            Comment.objects.create(
+                post=cls.post, author=commenter, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_page_inline(self):
+        """На странице поста выводятся только новые комментарии"""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), settings.COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0], Comment.objects.latest('created', 'id'))
+        self.assertTrue(comments.has_next())
+        self.assertContains(
+            response,
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        )
+
+    def test_fragments(self):
+        """Фрагменты отдают остальные комментарии без повторов"""
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        # Первый запрос ещё и запоминает автора поста для ETag.
+        self.guest_client.get(url)
+        seen = []
+        cursor = None
+        while True:
+            params = {'before': cursor} if cursor else {}
+            with self.assertNumQueries(1):
+                response = self.guest_client.get(url, params)
+            self.assertTemplateUsed(
+                response, 'posts/includes/comment_list.html'
+            )
+            self.assertTemplateNotUsed(response, 'base.html')
+            comments = response.context['comments']
+            seen.extend(comment.id for comment in comments)
+            cursor = comments.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), self.total)
+        self.assertEqual(
+            seen,
+            list(Comment.objects.order_by('-created', '-id').values_list(
+                'id', flat=True
+            ))
+        )
+
+    def test_missing_post(self):
+        """Фрагменты комментариев несуществующего поста дают 404"""
+        url = reverse('posts:post_comments', kwargs={'post_id': 0})
+        self.assertEqual(self.guest_client.get(url).status_code, 404)
+
+    def test_out_of_range_cursor(self):
+        """Курсор вне допустимого диапазона открывает первую страницу"""
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        response = self.guest_client.get(
+            url, {'before': '99999999999999999999999_1'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            len(response.context['comments']), settings.COMMENTS_PER_PAGE
+        )
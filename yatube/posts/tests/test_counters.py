@@ -0,0 +1,117 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.forms import PostForm
+from posts.models import Comment, Follow, Post, UserCounter
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+
+    def counter(self, user):
+        return UserCounter.objects.get(user=user)
+
+    def test_views_keep_counters(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками"""
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Пост'}
+        )
+        post = Post.objects.get(author=self.author)
+        self.assertEqual(self.counter(self.author).posts, 1)
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.id}),
+            {'text': 'Комментарий'}
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author.username}
+        ))
+        self.assertEqual(self.counter(self.author).followers, 1)
+        self.assertEqual(self.counter(self.reader).following, 1)
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertEqual(self.counter(self.author).followers, 0)
+        self.assertEqual(self.counter(self.reader).following, 0)
+        Comment.objects.filter(post=post).delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.assertEqual(self.counter(self.author).posts, 0)
+
+    def test_edit_keeps_comments_count(self):
+        """Правка поста не затирает комментарии, добавленные во время неё"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        clean = PostForm.clean
+
+        def comment_during_edit(form):
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий'
+            )
+            return clean(form)
+
+        with mock.patch.object(PostForm, 'clean', comment_during_edit):
+            self.author_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': post.id}),
+                {'text': 'Правка'}
+            )
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Правка')
+        self.assertEqual(post.comments_count, 1)
+
+    def test_counters_do_not_go_negative(self):
+        """Разошедшийся счётчик не мешает удалить комментарий"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+        UserCounter.objects.filter(user=self.author).update(posts=0)
+        comment.delete()
+        post.delete()
+        self.assertEqual(self.counter(self.author).posts, 0)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_profile_shows_counters(self):
+        """Профиль показывает счётчики без COUNT-запросов"""
+        Post.objects.create(text='Пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(reverse(
+            'posts:profile', kwargs={'username': self.author.username}
+        ))
+        self.assertEqual(response.context['counter'].posts, 1)
+        self.assertEqual(response.context['counter'].followers, 1)
+
+    def test_repair_command(self):
+        """Команда repair_counters исправляет расхождения"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Ком')
+        UserCounter.objects.filter(user=self.author).update(posts=10)
+        UserCounter.objects.filter(user=self.reader).delete()
+        Post.objects.filter(pk=post.pk).update(comments_count=5)
+        out = StringIO()
+        call_command('repair_counters', '--check', stdout=out)
+        self.assertIn('пользователей: 2, постов: 1', out.getvalue())
+        self.assertEqual(self.counter(self.author).posts, 10)
+        call_command('repair_counters', stdout=StringIO())
+        self.assertEqual(self.counter(self.author).posts, 1)
+        self.assertTrue(UserCounter.objects.filter(user=self.reader).exists())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
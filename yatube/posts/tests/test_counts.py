@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.counts import feed_key, get_feed_count
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Counter')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='counter',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост №{i}', author=cls.user, group=cls.group)
+            for i in range(settings.POST_PER_PAGE * 10)
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_follows_post_writes(self):
+        """Счётчики лент меняются при создании и удалении поста"""
+        keys = {
+            feed_key('global'): Post.objects.all(),
+            feed_key('group', self.group.id): self.group.posts.all(),
+            feed_key('author', self.user.id): self.user.posts.all(),
+            feed_key('follower', self.reader.id): Post.objects.filter(
+                author__following__user=self.reader
+            ),
+        }
+        for key, queryset in keys.items():
+            get_feed_count(key, queryset)
+        post = Post.objects.create(
+            text='Новый пост', author=self.user, group=self.group
+        )
+        for key, queryset in keys.items():
+            with self.subTest(key=key), self.assertNumQueries(0):
+                self.assertEqual(
+                    get_feed_count(key, queryset),
+                    (settings.POST_PER_PAGE * 10 + 1, False)
+                )
+        post.delete()
+        for key, queryset in keys.items():
+            with self.subTest(key=key):
+                self.assertEqual(
+                    get_feed_count(key, queryset)[0],
+                    settings.POST_PER_PAGE * 10
+                )
+
+    @override_settings(FEED_COUNT_LIMIT=20)
+    def test_large_feed_count_is_estimated(self):
+        """Большая лента не пересчитывается целиком"""
+        self.assertEqual(
+            get_feed_count(feed_key('global'), Post.objects.all()),
+            (20, True)
+        )
+
+    def test_page_links_window(self):
+        """Выводятся ссылки только на соседние страницы"""
+        response = self.client.get(reverse('posts:index'), {'page': 5})
+        page_obj = response.context['page_obj']
+        width = settings.PAGE_LINKS_WINDOW
+        self.assertEqual(
+            list(page_obj.window), list(range(5 - width, 5 + width + 1))
+        )
+        self.assertContains(response, 'class="page-link" href="?page=',
+                            count=len(page_obj.window) + 3)
+
+    @override_settings(FEED_COUNT_LIMIT=30)
+    def test_pages_past_estimate(self):
+        """Страницы за оценочным числом записей открываются по номеру"""
+        url = reverse('posts:index')
+        page_obj = self.client.get(url, {'page': 5}).context['page_obj']
+        self.assertEqual(page_obj.number, 5)
+        self.assertEqual(len(page_obj), settings.POST_PER_PAGE)
+        self.assertTrue(page_obj.has_next())
+        page_obj = self.client.get(url, {'page': 10}).context['page_obj']
+        self.assertEqual(page_obj.number, 10)
+        self.assertFalse(page_obj.has_next())
+        page_obj = self.client.get(url, {'page': 50}).context['page_obj']
+        self.assertEqual(page_obj.number, 10)
@@ -0,0 +1,149 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.guest_client = Client()
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        )
+
+    def revalidate(self, client, url, etag):
+        return client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_not_modified(self):
+        """Неизменившаяся страница отвечает 304 без запросов к базе"""
+        for url in self.urls():
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_writes_change_etag(self):
+        """Новые посты, комментарии и подписки меняют ETag"""
+        etags = {url: self.guest_client.get(url)['ETag']
+                 for url in self.urls()}
+        Post.objects.create(
+            text='Ещё пост', author=self.author, group=self.group
+        )
+        Comment.objects.create(post=self.post, author=self.reader, text='К')
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.revalidate(self.guest_client, url, etag), 200
+                )
+        url = reverse('posts:profile', kwargs={'username': self.author})
+        etag = self.guest_client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.revalidate(self.guest_client, url, etag), 200)
+
+    def test_post_edit_changes_etag(self):
+        """Правка поста меняет ETag его страницы"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etag = self.guest_client.get(url)['ETag']
+        self.post.text = 'Исправленный текст'
+        self.post.save()
+        self.assertEqual(self.revalidate(self.guest_client, url, etag), 200)
+
+    def test_etag_depends_on_viewer(self):
+        """ETag гостя не подходит авторизованному пользователю"""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        self.assertEqual(self.revalidate(self.reader_client, url, etag), 200)
+
+    def test_missing_objects(self):
+        """Несуществующие объекты по-прежнему дают 404"""
+        for url in (
+            reverse('posts:group_list', kwargs={'slug': 'missing'}),
+            reverse('posts:profile', kwargs={'username': 'missing'}),
+            reverse('posts:post_detail', kwargs={'post_id': 0}),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.guest_client.get(url).status_code, 404)
+
+    def test_renamed_objects(self):
+        """Смена slug группы и имени пользователя не оставляет
+        устаревших ETag в кэше"""
+        group = Group.objects.create(title='Группа', slug='old-slug')
+        user = User.objects.create_user(username='OldName')
+        post = Post.objects.create(text='Пост', author=user)
+        urls = {
+            'group': lambda: reverse(
+                'posts:group_list', kwargs={'slug': group.slug}
+            ),
+            'user': lambda: reverse(
+                'posts:profile', kwargs={'username': user.username}
+            ),
+        }
+        old_urls = {name: url() for name, url in urls.items()}
+        for url in old_urls.values():
+            self.assertEqual(self.guest_client.get(url).status_code, 200)
+        self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        group.slug = 'new-slug'
+        group.save()
+        user.username = 'NewName'
+        user.save()
+        for name, url in urls.items():
+            with self.subTest(name=name):
+                self.assertEqual(
+                    self.guest_client.get(old_urls[name]).status_code, 404
+                )
+                self.assertEqual(
+                    self.guest_client.get(url()).status_code, 200
+                )
+        post_id = post.id
+        post.delete()
+        group.delete()
+        self.assertEqual(self.guest_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': post_id}
+        )).status_code, 404)
+        self.assertEqual(self.guest_client.get(reverse(
+            'posts:group_list', kwargs={'slug': 'new-slug'}
+        )).status_code, 404)
+
+    def test_commenter_rename_changes_etag(self):
+        """Смена имени комментатора меняет ETag страницы поста"""
+        commenter = User.objects.create_user(username='OldCommenter')
+        Comment.objects.create(post=self.post, author=commenter, text='К')
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etag = self.guest_client.get(url)['ETag']
+        commenter.username = 'NewCommenter'
+        commenter.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'NewCommenter')
+        self.assertNotContains(response, 'OldCommenter')
@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.follows import get_following
+from posts.models import Follow
+
+User = get_user_model()
+
+
+class FollowingCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.other = User.objects.create_user(username='Other')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        Follow.objects.create(user=cls.reader, author=cls.other)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_loaded_once(self):
+        """Подписки загружаются одним запросом и дальше берутся из кэша"""
+        with self.assertNumQueries(1):
+            self.assertEqual(get_following(self.reader.id), {self.other.id})
+        with self.assertNumQueries(0):
+            get_following(self.reader.id)
+
+    def test_reloaded_after_change(self):
+        """Подписка и отписка сбрасывают множество, оно загружается
+        заново одним запросом"""
+        get_following(self.reader.id)
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author.username}
+        ))
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                get_following(self.reader.id),
+                {self.other.id, self.author.id}
+            )
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.other.username}
+        ))
+        with self.assertNumQueries(1):
+            self.assertEqual(get_following(self.reader.id), {self.author.id})
+        with self.assertNumQueries(0):
+            get_following(self.reader.id)
+
+    def test_profile_without_follow_query(self):
+        """Профиль с прогретым кэшем не обращается к таблице подписок"""
+        url = reverse('posts:profile', kwargs={'username': 'Other'})
+        self.reader_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reader_client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertFalse(
+            any('posts_follow' in query['sql'] for query in queries)
+        )
+        response = self.reader_client.get(
+            reverse('posts:profile', kwargs={'username': 'Author'})
+        )
+        self.assertFalse(response.context['following'])
@@ -8,6 +8,7 @@ from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from posts.models import Comment, Group, Post
+from posts.storage import content_name
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -73,7 +74,9 @@ class PostFormTest(TestCase):
             self.assertEqual(post.text, form_data['text'])
             self.assertEqual(post.author, self.user)
             self.assertEqual(
-                post.image.name, 'posts/' + form_data['image'].name
+                post.image.name,
+                content_name('posts/' + form_data['image'].name,
+                             form_data['image'])
             )
             self.assertEqual(post.group.id, form_data['group'])
 
@@ -0,0 +1,120 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.etags import index_etag
+from posts.middleware import page_key
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class HolePunchPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        )
+
+    def test_shared_page_filled_per_user(self):
+        """Общая страница отдаётся из кэша с частями для зрителя"""
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.author_client.get(url)
+                self.assertTemplateUsed(response, 'base.html')
+                cached = self.reader_client.get(url)
+                self.assertTemplateNotUsed(cached, 'base.html')
+                self.assertContains(cached, 'Пользователь: Reader')
+                self.assertNotContains(cached, 'Пользователь: Author')
+                self.assertNotContains(cached, '<!--hole:')
+                self.assertNotContains(response, '<!--hole:')
+                self.assertIn('Cookie', cached['Vary'])
+                self.assertNotEqual(cached['ETag'], response['ETag'])
+
+    def test_edit_and_follow_buttons(self):
+        """Кнопки правки и подписки зависят от зрителя, а не от копии"""
+        edit_url = reverse('posts:post_edit', kwargs={'post_id': self.post.id})
+        follow_url = reverse(
+            'posts:profile_follow', kwargs={'username': self.author}
+        )
+        unfollow_url = reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}
+        )
+        profile, detail = self.urls()[2:]
+        self.assertContains(self.author_client.get(profile), edit_url)
+        self.assertContains(self.author_client.get(detail), edit_url)
+        response = self.reader_client.get(profile)
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertNotContains(response, edit_url)
+        self.assertContains(response, follow_url)
+        self.assertNotContains(self.reader_client.get(detail), edit_url)
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(profile)
+        self.assertContains(response, unfollow_url)
+        self.assertNotContains(response, follow_url)
+
+    def test_comment_form_has_own_csrf_token(self):
+        """Форма комментария получает CSRF-токен зрителя"""
+        detail = self.urls()[3]
+        self.author_client.get(detail)
+        response = self.reader_client.get(detail)
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertIn('csrftoken', response.cookies)
+
+    def test_not_modified(self):
+        """Повторный запрос с ETag зрителя получает 304"""
+        url = self.urls()[0]
+        self.author_client.get(url)
+        etag = self.reader_client.get(url)['ETag']
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_cached_headers(self):
+        """Заполненная копия отдаётся с заголовками отрисованной"""
+        url = self.urls()[0]
+        response = self.reader_client.get(url)
+        cached = self.reader_client.get(url)
+        self.assertTemplateNotUsed(cached, 'base.html')
+        self.assertEqual(dict(cached.items()), dict(response.items()))
+        self.assertIn('X-Frame-Options', cached)
+
+    def test_not_modified_miss_is_cached(self):
+        """Ответ 304 на промахе не запрещает кэшировать общую копию"""
+        url = self.urls()[0]
+        response = self.reader_client.get(url)
+        request = response.wsgi_request
+        cache.delete(page_key(
+            request, f'holes:{index_etag(request, shared=True)}'
+        ))
+        response = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+        cached = self.author_client.get(url)
+        self.assertTemplateNotUsed(cached, 'base.html')
+        self.assertContains(cached, 'Пользователь: Author')
@@ -0,0 +1,126 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from PIL import Image
+from posts import images, thumbnails
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+# Тег EXIF Orientation: 6 — повернуть на 90° по часовой стрелке.
+ORIENTATION = 0x0112
+
+
+def make_jpeg(size, orientation=None):
+    image = Image.new('RGB', size, (200, 30, 30))
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera'
+    if orientation:
+        exif[ORIENTATION] = orientation
+    output = BytesIO()
+    image.save(output, 'JPEG', exif=exif.tobytes())
+    return SimpleUploadedFile('photo.jpg', output.getvalue(), 'image/jpeg')
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    THUMBNAIL_WORKERS=0,
+    IMAGE_MAX_SIZE=(400, 400),
+)
+class ImageIngestTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_ingest_downscales_and_strips_exif(self):
+        """Большая картинка уменьшается, поворачивается и теряет EXIF"""
+        result = images.ingest(make_jpeg((1000, 600), orientation=6))
+        image = Image.open(result)
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (240, 400))
+        self.assertNotIn('exif', image.info)
+        self.assertEqual(result.name, 'photo.jpg')
+
+    def test_ingest_keeps_clean_images(self):
+        """Небольшая картинка без метаданных сохраняется как есть"""
+        output = BytesIO()
+        Image.new('RGB', (50, 50)).save(output, 'PNG')
+        uploaded = SimpleUploadedFile(
+            'small.png', output.getvalue(), 'image/png'
+        )
+        self.assertIs(images.ingest(uploaded), uploaded)
+
+    def test_ingest_keeps_transparency(self):
+        """Прозрачный цвет GIF сохраняется при уменьшении"""
+        image = Image.new('P', (600, 600), 1)
+        output = BytesIO()
+        image.save(output, 'GIF', transparency=1)
+        result = images.ingest(SimpleUploadedFile(
+            'clear.gif', output.getvalue(), 'image/gif'
+        ))
+        image = Image.open(result)
+        self.assertEqual(image.size, (400, 400))
+        self.assertIn('transparency', image.info)
+        # Индекс в палитре GIF может смениться, прозрачность остаётся.
+        self.assertEqual(image.convert('RGBA').getpixel((0, 0))[3], 0)
+
+    def test_create_post_ingests_image_in_background(self):
+        """Картинка нового поста уменьшается и теряет EXIF
+        в фоновом обработчике, а не в запросе"""
+        self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'Пост с фото',
+            'image': make_jpeg((900, 900)),
+        })
+        post = Post.objects.get(text='Пост с фото')
+        original = post.image.name
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (900, 900))
+        thumbnails.render_post(post.id)
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, original)
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (400, 400))
+            self.assertNotIn('exif', image.info)
+        self.assertIsNotNone(thumbnails.thumbnail_url(post.image, 'card'))
+
+    @override_settings(IMAGE_VARIANTS={
+        'png': {'optimize': True}, 'nosuchformat': {}
+    })
+    def test_variants_recorded(self):
+        """Копии миниатюры создаются в доступных форматах и выводятся
+        в теге picture"""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=make_jpeg((300, 200))
+        )
+        thumbnails.render(post.image)
+        sources = thumbnails.image_sources(post.image, 'card')
+        self.assertEqual(
+            sorted(mime for mime, _ in sources), ['image/jpeg', 'image/png']
+        )
+        response = self.authorized_client.get(reverse('posts:index'))
+        for mime, url in sources:
+            with self.subTest(mime=mime):
+                self.assertContains(
+                    response, f'<source type="{mime}" srcset="{url}">'
+                )
@@ -0,0 +1,132 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.etags import group_lookup_key
+from posts.middleware import page_key
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        )
+
+    def test_served_without_database(self):
+        """Повторный запрос гостя без cookies не обращается к базе"""
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn('Cookie', response['Vary'])
+                with self.assertNumQueries(0):
+                    cached = self.guest_client.get(url)
+                self.assertEqual(cached.content, response.content)
+                self.assertIn('Cookie', cached['Vary'])
+                self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_cached_headers(self):
+        """Страница из кэша отдаётся с теми же заголовками"""
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                cached = self.guest_client.get(url)
+                self.assertIsNone(cached.context)
+                self.assertEqual(dict(cached.items()), dict(response.items()))
+                self.assertIn('X-Frame-Options', cached)
+
+    def test_not_modified_miss_is_cached(self):
+        """Ответ 304 на промахе не запрещает кэшировать страницу"""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        request = self.guest_client.get(url).wsgi_request
+        cache.delete(page_key(request, etag.strip('"')))
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.guest_client.get(url).status_code, 200)
+
+    def test_requests_with_cookies_bypass(self):
+        """Запросы с cookies и авторизованные запросы идут мимо кэша"""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        self.guest_client.cookies['sessionid'] = 'unknown'
+        response = self.guest_client.get(url)
+        self.assertIsNotNone(response.context)
+        reader = User.objects.create_user(username='Reader')
+        client = Client()
+        client.force_login(reader)
+        self.assertContains(client.get(url), 'Reader')
+
+    def test_writes_purge_pages(self):
+        """Посты, комментарии и правка группы обновляют страницы"""
+        for url in self.urls():
+            self.guest_client.get(url)
+        Post.objects.create(
+            text='Новый пост', author=self.author, group=self.group
+        )
+        for url in self.urls()[:3]:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), 'Новый пост')
+        detail = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Свежий комментарий'
+        )
+        self.assertContains(self.guest_client.get(detail), 'Свежий')
+        self.group.slug = 'new-slug'
+        self.group.save()
+        group_url = reverse('posts:group_list', kwargs={'slug': 'new-slug'})
+        urls = self.urls()
+        for url in (urls[0], urls[2], urls[3]):
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), group_url)
+
+    def test_missing_pages_not_cached(self):
+        """404 не сохраняется и не мешает следующим запросам"""
+        url = reverse('posts:group_list', kwargs={'slug': 'missing'})
+        self.assertEqual(self.guest_client.get(url).status_code, 404)
+        Group.objects.create(title='Новая', slug='missing', description='')
+        cache.delete(group_lookup_key('missing'))
+        self.assertEqual(self.guest_client.get(url).status_code, 200)
+
+    def test_group_delete_purges_pages(self):
+        """Удаление группы убирает ссылку на неё со страниц"""
+        group = Group.objects.create(
+            title='Удаляемая', slug='deleted', description=''
+        )
+        Post.objects.create(text='Пост группы', author=self.author,
+                            group=group)
+        group_url = reverse('posts:group_list', kwargs={'slug': group.slug})
+        urls = self.urls()
+        pages = (urls[0], urls[2])
+        for url in pages:
+            self.assertContains(self.guest_client.get(url), group_url)
+        group.delete()
+        for url in pages:
+            with self.subTest(url=url):
+                self.assertNotContains(self.guest_client.get(url), group_url)
+        self.assertEqual(self.guest_client.get(group_url).status_code, 404)
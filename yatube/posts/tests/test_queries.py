@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.urls import urlpatterns
+
+User = get_user_model()
+
+# Предельное число SQL-запросов на страницу для авторизованного
+# пользователя с пустым кэшем. Сессия и пользователь — это 2 запроса,
+# транзакция пишущей страницы — ещё 2 (SAVEPOINT и RELEASE).
+# Страницы с ETag по объекту из адреса при пустом кэше делают ещё
+# один запрос, чтобы найти его id.
+QUERY_BUDGETS = {
+    'index': 3,
+    'group_list': 5,
+    'profile': 6,
+    'post_detail': 5,
+    'post_comments': 4,
+    'search': 4,
+    'follow_index': 4,
+    'post_create': 5,
+    'post_edit': 4,
+    'add_comment': 5,
+    'profile_follow': 12,
+    'profile_unfollow': 9,
+}
+
+
+class QueryBudgetTest(TestCase):
+    """Число запросов каждой страницы не превышает бюджет
+    и не зависит от числа записей на странице."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Budget')
+        cls.author = User.objects.create_user(username='Author')
+        cls.stranger = User.objects.create_user(username='Stranger')
+        cls.client_user = Client()
+        cls.client_user.force_login(cls.user)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='budget',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ком')
+
+    def setUp(self):
+        cache.clear()
+
+    def urls(self):
+        kwargs = {
+            'slug': self.group.slug,
+            'username': self.author.username,
+            'post_id': self.post.id,
+        }
+        for pattern in urlpatterns:
+            names = pattern.pattern.converters
+            url_kwargs = {name: kwargs[name] for name in names}
+            if pattern.name == 'profile_follow':
+                url_kwargs['username'] = self.stranger.username
+            url = reverse(f'posts:{pattern.name}', kwargs=url_kwargs)
+            if pattern.name == 'search':
+                url += '?q=Пост'
+            yield pattern.name, url
+
+    def count_queries(self, url):
+        cache.clear()
+        # Изменения, сделанные страницей, откатываются, чтобы каждый
+        # адрес измерялся на одних и тех же данных.
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                self.client_user.get(url)
+            transaction.set_rollback(True)
+        return len(queries)
+
+    def add_page_of_data(self):
+        for i in range(settings.POST_PER_PAGE):
+            author = User.objects.create_user(username=f'Author{i}')
+            Follow.objects.create(user=self.user, author=author)
+            post = Post.objects.create(
+                text=f'Пост {i}', author=author, group=self.group
+            )
+            Post.objects.create(
+                text=f'Пост автора {i}', author=self.author, group=self.group
+            )
+            Comment.objects.create(
+                post=self.post, author=author, text=f'Ком {i}'
+            )
+            Comment.objects.create(post=post, author=author, text='Ком')
+
+    def test_every_view_has_budget(self):
+        """Для каждого адреса posts объявлен бюджет запросов"""
+        for name, url in self.urls():
+            with self.subTest(name=name):
+                self.assertIn(name, QUERY_BUDGETS)
+
+    def test_views_within_budget(self):
+        """Страницы укладываются в бюджет на одной и на полной странице"""
+        small = {name: self.count_queries(url) for name, url in self.urls()}
+        self.add_page_of_data()
+        for name, url in self.urls():
+            with self.subTest(name=name):
+                queries = self.count_queries(url)
+                self.assertLessEqual(queries, QUERY_BUDGETS[name])
+                self.assertEqual(queries, small[name])
@@ -0,0 +1,102 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api.urls import urlpatterns as api_urlpatterns
+from posts.models import Comment, Follow, Group, Post
+from posts.urls import urlpatterns
+
+User = get_user_model()
+
+# Проход по таблице без индекса. Проход по индексу в порядке
+# сортировки (SCAN ... USING INDEX) с LIMIT допустим.
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(\w+)(?: AS \w+)?$')
+TEMP_SORT = 'USE TEMP B-TREE'
+# Таблицы, которые страницы читают целиком по замыслу:
+# группы выводятся списком в форме поста.
+WHOLE_TABLES = {'posts_group'}
+QUERY_PARAMS = {
+    'posts:search': {'q': 'Пост'},
+    'api:follow_status': {'usernames': 'Author'},
+}
+
+
+class QueryPlanTest(TestCase):
+    """Запросы страниц идут по индексам: без полного прохода
+    по таблицам и без сортировки во временном B-дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Planner')
+        cls.author = User.objects.create_user(username='Author')
+        cls.client_user = Client()
+        cls.client_user.force_login(cls.user)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='plans',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ком')
+
+    def setUp(self):
+        cache.clear()
+
+    def urls(self):
+        kwargs = {
+            'slug': self.group.slug,
+            'username': self.author.username,
+            'post_id': self.post.id,
+        }
+        patterns = [('posts', pattern) for pattern in urlpatterns]
+        patterns += [('api', pattern) for pattern in api_urlpatterns]
+        for namespace, pattern in patterns:
+            names = pattern.pattern.converters
+            name = f'{namespace}:{pattern.name}'
+            url = reverse(name, kwargs={key: kwargs[key] for key in names})
+            yield name, url
+
+    def plans(self, name, url):
+        """Планы SELECT-запросов, сделанных страницей."""
+        cache.clear()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                self.client_user.get(url, QUERY_PARAMS.get(name, {}))
+            transaction.set_rollback(True)
+        with connection.cursor() as cursor:
+            for query in queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+                yield query['sql'], [row[-1] for row in cursor.fetchall()]
+
+    def test_no_full_scans(self):
+        """Ни один запрос страниц не читает таблицу целиком"""
+        for name, url in self.urls():
+            for sql, plan in self.plans(name, url):
+                for step in plan:
+                    match = FULL_SCAN.match(step)
+                    if match and match[2] not in WHOLE_TABLES:
+                        self.fail(f'{name}: {step}\n{sql}')
+
+    def test_no_temp_sorts(self):
+        """Сортировка лент берётся из индекса, а не из B-дерева"""
+        for name, url in self.urls():
+            for sql, plan in self.plans(name, url):
+                # Результаты полнотекстового поиска сортируются
+                # по релевантности, индекса для неё нет.
+                if any('VIRTUAL TABLE' in step for step in plan):
+                    continue
+                with self.subTest(name=name, sql=sql):
+                    self.assertFalse(
+                        [step for step in plan if TEMP_SORT in step]
+                    )
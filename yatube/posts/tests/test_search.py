@@ -0,0 +1,99 @@
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.search import match_expression, search_posts
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.rich = Post.objects.create(
+            text='Кошка кошка кошка', author=cls.author, group=cls.group
+        )
+        cls.poor = Post.objects.create(
+            text='Кошка и длинный текст, а ещё собака и прочее',
+            author=cls.other
+        )
+        cls.unrelated = Post.objects.create(
+            text='Собака', author=cls.author
+        )
+        cls.guest_client = Client()
+
+    def ids(self, posts):
+        return [post.id for post in posts]
+
+    def test_ranked_results(self):
+        """Находятся только подходящие посты, более релевантные выше"""
+        posts, next_cursor = search_posts('кошка', 10)
+        self.assertEqual(self.ids(posts), [self.rich.id, self.poor.id])
+        self.assertIsNone(next_cursor)
+
+    def test_filters(self):
+        """Результаты фильтруются по группе и автору"""
+        posts, _ = search_posts('кошка', 10, group=self.group)
+        self.assertEqual(self.ids(posts), [self.rich.id])
+        posts, _ = search_posts('кошка', 10, author=self.other)
+        self.assertEqual(self.ids(posts), [self.poor.id])
+
+    def test_cursor_pagination(self):
+        """Курсор отдаёт следующую страницу без повторов"""
+        first, next_cursor = search_posts('кошка', 1)
+        self.assertEqual(self.ids(first), [self.rich.id])
+        second, next_cursor = search_posts('кошка', 1, after=next_cursor)
+        self.assertEqual(self.ids(second), [self.poor.id])
+        self.assertIsNone(next_cursor)
+
+    def test_index_follows_writes(self):
+        """Индекс обновляется при изменении и удалении поста"""
+        self.unrelated.text = 'Кошка'
+        self.unrelated.save()
+        posts, _ = search_posts('собака', 10)
+        self.assertEqual(self.ids(posts), [self.poor.id])
+        self.unrelated.delete()
+        posts, _ = search_posts('кошка', 10)
+        self.assertNotIn(self.unrelated.id, self.ids(posts))
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 во вводе не ломают запрос"""
+        self.assertEqual(match_expression('a "b" OR'), '"a" """b""" "OR"')
+        for query in ('"', 'кошка AND', 'NEAR(', '*', ''):
+            with self.subTest(query=query):
+                search_posts(query, 10)
+
+    def test_search_page(self):
+        """Страница поиска выводит найденные посты и ссылку дальше"""
+        response = self.guest_client.get(
+            reverse('posts:search'),
+            {'q': 'кошка', 'author': self.author.username}
+        )
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(self.ids(response.context['posts']), [self.rich.id])
+        self.assertEqual(response.context['author'], self.author)
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'кошка', 'group': 'missing'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_admin_search(self):
+        """Поиск в админке идёт по полнотекстовому индексу"""
+        model_admin = site._registry[Post]
+        request = RequestFactory().get('/')
+        queryset, _ = model_admin.get_search_results(
+            request, Post.objects.all(), 'собака'
+        )
+        self.assertEqual(
+            set(self.ids(queryset)), {self.poor.id, self.unrelated.id}
+        )
@@ -0,0 +1,189 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from posts import media, thumbnails
+from posts.models import Post
+from sorl.thumbnail import default
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00')
+
+
+def make_gif(name, content=SMALL_GIF):
+    return SimpleUploadedFile(name, content, 'image/gif')
+
+
+def stored_files():
+    return sorted(os.listdir(os.path.join(TEMP_MEDIA_ROOT, 'posts')))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_identical_uploads_stored_once(self):
+        """Одинаковые загрузки получают одно имя по SHA-256 и один файл"""
+        first = Post.objects.create(
+            text='Первый', author=self.user, image=make_gif('one.GIF')
+        )
+        second = Post.objects.create(
+            text='Второй', author=self.user, image=make_gif('two.gif')
+        )
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
+        self.assertEqual(first.image.name, f'posts/{digest}.gif')
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(stored_files(), [f'{digest}.gif'])
+
+    def test_release_keeps_shared_file(self):
+        """Файл удаляется только когда на него не ссылается ни один пост"""
+        first = Post.objects.create(
+            text='Первый', author=self.user, image=make_gif('one.gif')
+        )
+        second = Post.objects.create(
+            text='Второй', author=self.user, image=make_gif('two.gif')
+        )
+        name = first.image.name
+        first.delete()
+        self.assertFalse(media.release(name))
+        self.assertTrue(default_storage.exists(name))
+        second.delete()
+        self.assertTrue(media.release(name))
+        self.assertFalse(default_storage.exists(name))
+
+    def test_release_deletes_thumbnails(self):
+        """Вместе с файлом удаляются миниатюры и их адреса в кэше"""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=make_gif('one.gif')
+        )
+        name = post.image.name
+        self.assertTrue(thumbnails.render(post.image))
+        renditions = [
+            thumbnails.rendition_name(name, geometry, options)
+            for geometry, options in settings.POST_THUMBNAILS.values()
+        ]
+        post.delete()
+        media.release(name)
+        for rendition_name in renditions:
+            self.assertFalse(default.storage.exists(rendition_name))
+        self.assertIsNone(thumbnails.thumbnail_url(post.image, 'card'))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ReleaseOnCommitTest(TransactionTestCase):
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_post_delete_and_edit_release_files(self):
+        """Удаление поста и замена картинки удаляют ненужные файлы"""
+        user = User.objects.create_user(username='HasNoName')
+        post = Post.objects.create(
+            text='Пост', author=user, image=make_gif('one.gif')
+        )
+        old_name = post.image.name
+        post.image = make_gif('two.gif', OTHER_GIF)
+        post.save()
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertTrue(default_storage.exists(post.image.name))
+        post.delete()
+        self.assertEqual(stored_files(), [])
+
+    def test_release_checks_references_in_transaction(self):
+        """Ссылки проверяются в той же транзакции, что и удаление"""
+        user = User.objects.create_user(username='HasNoName')
+        name = Post.objects.create(
+            text='Пост', author=user, image=make_gif('one.gif')
+        ).image.name
+        # update() не вызывает сигналов: файл остаётся на месте.
+        Post.objects.update(image='')
+        checks = []
+
+        def is_referenced(name):
+            checks.append(connection.in_atomic_block)
+            return False
+
+        with mock.patch.object(media, 'is_referenced', is_referenced):
+            self.assertTrue(media.release(name))
+        self.assertEqual(checks, [True])
+        self.assertFalse(default_storage.exists(name))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class DedupeMediaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.names = [
+            default_storage.save(f'posts/image_{i}.gif',
+                                 ContentFile(SMALL_GIF))
+            for i in range(3)
+        ]
+        for name in self.names:
+            Post.objects.create(text='Пост', author=self.user, image=name)
+
+    def test_dry_run_changes_nothing(self):
+        """--dry-run только считает дубли"""
+        out = StringIO()
+        call_command('dedupe_media', dry_run=True, stdout=out)
+        self.assertIn('Найдено дублей: 2', out.getvalue())
+        self.assertEqual(
+            stored_files(), [os.path.basename(name) for name in self.names]
+        )
+
+    def test_dedupe_renames_and_removes_duplicates(self):
+        """Дубли сводятся к одному файлу, посты ссылаются на него"""
+        out = StringIO()
+        call_command('dedupe_media', stdout=out)
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
+        self.assertIn('Удалено дублей: 2', out.getvalue())
+        self.assertEqual(stored_files(), [f'{digest}.gif'])
+        self.assertEqual(
+            set(Post.objects.values_list('image', flat=True)),
+            {f'posts/{digest}.gif'}
+        )
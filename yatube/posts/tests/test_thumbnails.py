@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.post = cls.make_post('small.gif')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    @classmethod
+    def make_post(cls, image_name):
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        # Хвост после конца GIF делает файлы разными, иначе хранилище
+        # свело бы их в один.
+        return Post.objects.create(
+            text='Тестовый текст',
+            author=cls.user,
+            image=SimpleUploadedFile(
+                name=image_name, content=small_gif + image_name.encode(),
+                content_type='image/gif'
+            )
+        )
+
+    def test_scheduled_thumbnail_is_served_from_cache(self):
+        """Миниатюра, созданная заранее, выводится без sorl"""
+        thumbnails.schedule(self.post)
+        url = thumbnails.thumbnail_url(self.post.image, 'card')
+        self.assertTrue(url.startswith(settings.MEDIA_URL + 'cache/'))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, f'src="{url}"')
+
+    def test_placeholder_until_thumbnail_ready(self):
+        """Пока миниатюры нет, страница показывает заглушку"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, '<img class="card-img')
+        self.assertContains(response, 'aspect-ratio')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '<img class="card-img')
+
+    def test_warm_thumbnails_command(self):
+        """Команда warm_thumbnails создаёт недостающие миниатюры"""
+        thumbnails.render(self.post.image)
+        post = self.make_post('warm.gif')
+        state = os.path.join(TEMP_MEDIA_ROOT, 'state')
+        self.assertEqual(
+            thumbnails.missing_renditions(post.image.name), ['card']
+        )
+        out = StringIO()
+        call_command(
+            'warm_thumbnails', '--workers', '0', '--state', state, stdout=out
+        )
+        self.assertIn('без миниатюр: 1', out.getvalue())
+        self.assertIn('Готово: 1, ошибок: 0', out.getvalue())
+        self.assertIn('картинок/с', out.getvalue())
+        self.assertEqual(thumbnails.missing_renditions(post.image.name),
+                         [])
+        self.assertIsNotNone(thumbnails.thumbnail_url(post.image, 'card'))
+        out = StringIO()
+        call_command(
+            'warm_thumbnails', '--workers', '0', '--state', state,
+            '--resume', stdout=out
+        )
+        self.assertIn('Картинок: 0', out.getvalue())
@@ -0,0 +1,89 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, Timeline
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.other = User.objects.create_user(username='Other')
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_post_fan_out(self):
+        """Новый пост попадает в ленты подписчиков при публикации"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertTrue(
+            Timeline.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertFalse(Timeline.objects.filter(user=self.other).exists())
+        self.assertEqual(self.feed(), [post])
+
+    def test_follow_backfill_and_unfollow(self):
+        """Подписка добавляет старые посты, отписка убирает их"""
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author.username}
+        ))
+        self.assertEqual(self.feed(), posts[::-1])
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(Timeline.objects.filter(user=self.reader).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_is_pulled(self):
+        """Посты автора с большим числом подписчиков подтягиваются
+        при чтении ленты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post])
+        self.assertFalse(Timeline.objects.filter(user=self.other).exists())
+
+    def test_rebuild_command(self):
+        """Команда rebuild_timeline восстанавливает ленты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        Timeline.objects.all().delete()
+        call_command('rebuild_timeline', stdout=StringIO())
+        self.assertEqual(self.feed(), [post])
+
+    def test_rebuild_refreshes_cached_feed(self):
+        """После rebuild_timeline лента не отдаётся из кэша фрагментов"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text='Восстановленный пост', author=self.author)
+        Timeline.objects.all().delete()
+        url = reverse('posts:follow_index')
+        self.assertNotContains(
+            self.reader_client.get(url), 'Восстановленный пост'
+        )
+        call_command('rebuild_timeline', stdout=StringIO())
+        self.assertContains(
+            self.reader_client.get(url), 'Восстановленный пост'
+        )
@@ -1,6 +1,7 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 
 from posts.models import Group, Post
@@ -26,6 +27,9 @@ class PostsURLTests(TestCase):
             group=cls.group
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_public_pages(self):
         '''Проверка доступности страницы неавторизованного клиента'''
         url_address = (
@@ -62,6 +62,9 @@ class PostsPagesTests(TestCase):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
+    def setUp(self):
+        cache.clear()
+
     def check_post_equal(self, post):
         with self.subTest(post=post):
             self.assertEqual(post.text, self.post.text)
@@ -116,15 +119,63 @@ class PostsPagesTests(TestCase):
 
     def test_index_cached(self):
         """Хранится ли index в кэше"""
+        # Первый запрос создаёт миниатюру и сбрасывает поколение ленты.
+        self.client.get(reverse('posts:index'))
         response = self.client.get(reverse('posts:index'))
         cached_content = response.content
-        Post.objects.all().delete()
+        # update() не отправляет сигналов и не сбрасывает поколение ленты.
+        Post.objects.update(text='Изменённый текст')
         response = self.client.get(reverse('posts:index'))
         self.assertEqual(cached_content, response.content)
         cache.clear()
         response = self.client.get(reverse('posts:index'))
         self.assertNotEqual(cached_content, response.content)
 
+    def test_feed_cache_invalidation(self):
+        """Запись поста сбрасывает кэш только затронутых лент"""
+        cache.clear()
+        other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание'
+        )
+        urls = {
+            'index': reverse('posts:index'),
+            'group': reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ),
+            'other_group': reverse(
+                'posts:group_list', kwargs={'slug': other_group.slug}
+            ),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': self.user.username}
+            ),
+        }
+        before = {
+            name: self.client.get(url).content for name, url in urls.items()
+        }
+        post = Post.objects.create(
+            text='Свежий пост', author=self.user, group=self.group
+        )
+        for name, url in urls.items():
+            with self.subTest(name=name):
+                content = self.client.get(url).content.decode()
+                if name == 'other_group':
+                    self.assertEqual(content, before[name].decode())
+                else:
+                    self.assertIn(post.text, content)
+        post.delete()
+        for name in ('index', 'group', 'profile'):
+            with self.subTest(name=name):
+                self.assertNotContains(self.client.get(urls[name]), post.text)
+
+    def test_follow_cache_separate_from_index(self):
+        """Лента подписок не отдаёт закэшированную главную страницу"""
+        cache.clear()
+        self.new_authorized_client.get(reverse('posts:index'))
+        response = self.new_authorized_client.get(
+            reverse('posts:follow_index')
+        )
+        self.assertNotContains(response, self.post.text)
+
     def test_post_detail_context(self):
         """Проверка контекста post_detail"""
         response = self.authorized_client.get(
@@ -214,11 +265,11 @@ class PostsPagesTests(TestCase):
         unfollowed_client.force_login(user)
         Follow.objects.create(user=self.new_user, author=self.user)
         response = unfollowed_client.get(reverse('posts:follow_index'))
-        self.assertEqual(len(response.context['posts']), 0)
+        self.assertEqual(len(response.context['page_obj']), 0)
         response = self.new_authorized_client.get(
             reverse('posts:follow_index')
         )
-        self.assertNotEqual(len(response.context['posts']), 0)
+        self.assertNotEqual(len(response.context['page_obj']), 0)
 
 
 class PaginatorViewsTest(TestCase):
@@ -242,6 +293,11 @@ class PaginatorViewsTest(TestCase):
             ))
         Post.objects.bulk_create(cls.post)
 
+    def setUp(self):
+        # bulk_create не отправляет сигналов, и страницы гостей
+        # из прошлых тестов остались бы в кэше.
+        cache.clear()
+
     def test_first_page_contains_ten_records(self):
         """Проверка первой страницы paginator"""
         templates_pages_names = (
@@ -267,3 +323,106 @@ class PaginatorViewsTest(TestCase):
             with self.subTest(reverse_name=reverse_name):
                 response = self.client.get(reverse_name + '?page=2')
                 self.assertEqual(len(response.context['page_obj']), 3)
+
+
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Cursor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='cursor',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост №{i}', author=cls.user, group=cls.group)
+            for i in range(settings.POST_PER_PAGE * 2 + 3)
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user.username})
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url):
+        ids = []
+        page_obj = self.client.get(url).context['page_obj']
+        ids.extend(post.id for post in page_obj)
+        while page_obj.has_next():
+            page_obj = self.client.get(
+                url, {'before': page_obj.next_cursor}
+            ).context['page_obj']
+            ids.extend(post.id for post in page_obj)
+        return ids, page_obj
+
+    def test_cursor_pages_cover_feed(self):
+        """Курсорные страницы выдают всю ленту без повторов и пропусков"""
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                ids, last_page = self.walk(url)
+                self.assertEqual(ids, expected)
+                self.assertEqual(len(last_page), 3)
+                self.assertTrue(last_page.has_previous())
+
+    def test_cursor_previous_page(self):
+        """Ссылка «Предыдущая» возвращает предыдущую страницу"""
+        url = reverse('posts:index')
+        first = self.client.get(url).context['page_obj']
+        second = self.client.get(
+            url, {'before': first.next_cursor}
+        ).context['page_obj']
+        third = self.client.get(
+            url, {'before': second.next_cursor}
+        ).context['page_obj']
+        back = self.client.get(
+            url, {'after': third.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), list(second))
+        back = self.client.get(
+            url, {'after': second.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_cursor_page_without_count(self):
+        """Курсорная страница не выполняет COUNT(*) по ленте"""
+        page_obj = self.client.get(reverse('posts:index')).context['page_obj']
+        with self.assertNumQueries(1):
+            self.client.get(
+                reverse('posts:index'), {'before': page_obj.next_cursor}
+            )
+
+    def test_broken_cursor_opens_first_page(self):
+        """Испорченный курсор открывает первую страницу"""
+        response = self.client.get(reverse('posts:index'), {'before': 'x_1'})
+        self.assertFalse(response.context['page_obj'].has_previous())
+        self.assertEqual(
+            len(response.context['page_obj']), settings.POST_PER_PAGE
+        )
+
+    def test_out_of_range_cursor_opens_first_page(self):
+        """Курсор с числами вне допустимого диапазона открывает
+        первую страницу"""
+        url = reverse('posts:index')
+        for params in (
+            {'before': '99999999999999999999999_1'},
+            {'before': '1_99999999999999999999999'},
+            {'after': '1_9999999999999999999999'},
+            {'after': f'{2 ** 62}_1'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.context['page_obj'].has_previous())
+                self.assertEqual(
+                    len(response.context['page_obj']), settings.POST_PER_PAGE
+                )
@@ -0,0 +1,189 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from .counts import feed_key, post_feed_keys
+from .etags import post_key
+from .fragments import bump_generations
+from .images import ingest, save_variants
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def url_key(name, rendition):
+    return f'thumbnail:{rendition}:{name}'
+
+
+def sources_key(name, rendition):
+    return f'thumbnail:{rendition}:{name}:sources'
+
+
+def thumbnail_url(image, rendition):
+    """Адрес готовой миниатюры или None, если она ещё не создана."""
+    return cache.get(url_key(image.name, rendition))
+
+
+def image_sources(image, rendition):
+    """Пары (MIME-тип, адрес) копий миниатюры, от меньшей к большей."""
+    return cache.get(sources_key(image.name, rendition), [])
+
+
+def image_storage():
+    return Post._meta.get_field('image').storage
+
+
+def rendition_name(name, geometry, options, storage=None):
+    """Имя файла миниатюры, которое даст sorl, без открытия картинки.
+
+    Повторяет подготовку параметров из ThumbnailBackend.get_thumbnail.
+    Имя зависит от класса хранилища исходной картинки. Нужно только
+    для удаления: создание миниатюр идёт через get_thumbnail.
+    """
+    backend = default.backend
+    source = ImageFile(name, storage or image_storage())
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def missing_renditions(name):
+    """Миниатюры картинки, адресов которых ещё нет в кэше."""
+    keys = {
+        url_key(name, rendition): rendition
+        for rendition in settings.POST_THUMBNAILS
+    }
+    cached = cache.get_many(list(keys))
+    return [rendition for key, rendition in keys.items() if key not in cached]
+
+
+def render_urls(name):
+    """Создаёт недостающие миниатюры картинки.
+
+    Возвращает адреса миниатюр для кэша или None при ошибке.
+    Готовые миниатюры sorl находит в своём хранилище ключей
+    и не создаёт заново.
+    """
+    urls = {}
+    try:
+        for rendition, (geometry, options) in (
+            settings.POST_THUMBNAILS.items()
+        ):
+            thumbnail = get_thumbnail(
+                ImageFile(name, image_storage()), geometry, **options
+            )
+            if not thumbnail.exists():
+                return None
+            urls[url_key(name, rendition)] = thumbnail.url
+            urls[sources_key(name, rendition)] = save_variants(
+                default.storage, thumbnail.name
+            )
+    except Exception:
+        logger.exception('Ошибка при создании миниатюр %s', name)
+        return None
+    return urls
+
+
+def ingest_stored(post):
+    """Уменьшает и очищает от метаданных сохранённую картинку поста.
+
+    Очищенная картинка сохраняется под новым именем по содержимому,
+    и на неё переводятся все посты с этой загрузкой. Исходный файл
+    удалит сигнал post_saved, когда ссылок на него не останется.
+    """
+    name = post.image.name
+    try:
+        with image_storage().open(name) as content:
+            result = ingest(content)
+            if result is content:
+                return
+    except Exception:
+        logger.exception('Ошибка при обработке картинки %s', name)
+        return
+    # Файл и ссылки на него пишутся в одной транзакции, как в запросах:
+    # иначе media.release может удалить файл до записи постов.
+    with transaction.atomic():
+        post.image.name = image_storage().save(name, result)
+        for shared in Post.objects.filter(image=name):
+            shared.image.name = post.image.name
+            shared.save(update_fields=['image', 'updated'])
+
+
+def render(image):
+    """Создаёт все миниатюры картинки с копиями в сжатых форматах
+    и запоминает их адреса."""
+    urls = render_urls(image.name)
+    if urls is None:
+        return False
+    cache.set_many(urls, None)
+    return True
+
+
+def render_post(post_id):
+    try:
+        post = Post.objects.filter(pk=post_id).first()
+        if post is None or not post.image:
+            return
+        ingest_stored(post)
+        if not render(post.image):
+            logger.warning('Не удалось создать миниатюры %s', post.image)
+            return
+        # Карточка и страницы лент могли закэшироваться с заглушкой
+        # вместо картинки.
+        Post.objects.filter(pk=post.pk).update(updated=timezone.now())
+        bump_generations(post_feed_keys(post) + [post_key(post.pk)] + [
+            feed_key('follower', user_id)
+            for user_id in post.timeline.values_list('user_id', flat=True)
+        ])
+    except Exception:
+        logger.exception('Ошибка при создании миниатюр поста %s', post_id)
+
+
+def render_in_worker(post_id):
+    try:
+        render_post(post_id)
+    finally:
+        connection.close()
+
+
+def schedule(post):
+    """Отправляет картинку поста в пул фоновых обработчиков.
+
+    Повторная постановка той же картинки в очередь пропускается,
+    пока не истечёт THUMBNAIL_RETRY_AFTER.
+    """
+    global _executor
+    if post.pk is None or not post.image:
+        return
+    if not cache.add(f'thumbnail:pending:{post.image.name}', True,
+                     settings.THUMBNAIL_RETRY_AFTER):
+        return
+    # Базу в памяти (тесты) потоки делят с основным, и блокировки
+    # таблиц из фонового потока ломают запросы, поэтому без пула.
+    if not settings.THUMBNAIL_WORKERS or connection.is_in_memory_db():
+        render_post(post.pk)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails'
+        )
+    _executor.submit(render_in_worker, post.pk)
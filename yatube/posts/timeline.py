@@ -0,0 +1,132 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+
+from . import follows
+from .counts import feed_key, reset_feed_counts
+from .fragments import bump_generations
+from .models import Follow, Post, Timeline
+
+PULL_AUTHORS_KEY = 'timeline:pull_authors'
+
+
+def pull_authors():
+    """Авторы, чьи посты не раскладываются по лентам подписчиков
+    при публикации, а подтягиваются читателями."""
+    authors = cache.get(PULL_AUTHORS_KEY)
+    if authors is None:
+        authors = set(
+            Follow.objects.order_by().values('author').annotate(
+                followers=Count('id')
+            ).filter(
+                followers__gt=settings.TIMELINE_FANOUT_LIMIT
+            ).values_list('author', flat=True)
+        )
+        cache.set(PULL_AUTHORS_KEY, authors, None)
+    return authors
+
+
+def add_entries(user_ids, posts):
+    Timeline.objects.bulk_create(
+        (
+            Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for user_id in user_ids
+            for post_id, pub_date in posts
+        ),
+        batch_size=500,
+        ignore_conflicts=True
+    )
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора.
+
+    Возвращает id подписчиков или None, если у автора слишком много
+    подписчиков и пост будет подтянут при чтении ленты.
+    """
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    if post.author_id in pull_authors():
+        return None
+    followers = list(
+        Follow.objects.filter(author_id=post.author_id).values_list(
+            'user_id', flat=True
+        )[:limit + 1]
+    )
+    if len(followers) > limit:
+        cache.set(PULL_AUTHORS_KEY, pull_authors() | {post.author_id}, None)
+        return None
+    add_entries(followers, [(post.id, post.pub_date)])
+    return followers
+
+
+def backfill(user_id, author_id):
+    backfill_many(user_id, [author_id])
+
+
+def backfill_many(user_id, author_ids):
+    add_entries(
+        [user_id],
+        Post.objects.filter(author_id__in=author_ids).values_list(
+            'id', 'pub_date'
+        ).iterator()
+    )
+
+
+def remove(user_id, author_id):
+    remove_many(user_id, [author_id])
+
+
+def remove_many(user_id, author_ids):
+    Timeline.objects.filter(
+        user_id=user_id, post__author_id__in=author_ids
+    ).delete()
+
+
+def pull(user):
+    """Подтягивает в ленту пользователя новые посты авторов,
+    для которых раскладка при публикации не выполнялась.
+
+    Возвращает True, если в ленту что-то добавилось.
+    """
+    authors = pull_authors()
+    if not authors:
+        return False
+    authors = list(follows.get_following(user.id) & authors)
+    if not authors:
+        return False
+    latest = dict(
+        Timeline.objects.filter(
+            user=user, post__author_id__in=authors
+        ).order_by().values_list('post__author_id').annotate(
+            since=Max('pub_date')
+        )
+    )
+    condition = Q()
+    for author_id in authors:
+        if author_id in latest:
+            condition |= Q(author_id=author_id, pub_date__gt=latest[author_id])
+        else:
+            condition |= Q(author_id=author_id)
+    posts = list(
+        Post.objects.filter(condition).values_list('id', 'pub_date')
+    )
+    add_entries([user.id], posts)
+    return bool(posts)
+
+
+def rebuild(users):
+    """Заново собирает ленты пользователей из подписок."""
+    cache.delete(PULL_AUTHORS_KEY)
+    keys = []
+    for user in users:
+        Timeline.objects.filter(user=user).delete()
+        add_entries(
+            [user.id],
+            Post.objects.filter(author__following__user=user).values_list(
+                'id', 'pub_date'
+            ).iterator()
+        )
+        keys.append(feed_key('follower', user.id))
+    # Страницы и число записей лент в кэше собраны по старым лентам.
+    reset_feed_counts(keys)
+    bump_generations(keys)
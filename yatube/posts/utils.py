@@ -1,12 +1,220 @@
+from datetime import datetime, timedelta
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .counts import get_feed_count
+from .models import Comment
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Наибольшее целое, которое SQLite хранит в столбце INTEGER.
+MAX_CURSOR_VALUE = 2 ** 63 - 1
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (pub_date, id) без COUNT(*) и OFFSET.
+
+    Страница выбирается условием по ключу последней показанной записи,
+    поэтому стоимость запроса не зависит от глубины листания.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, fields=('pub_date', 'id'),
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.fields = fields
+        self.has_next = False
+        self.has_previous = False
+
+    @property
+    def num_pages(self):
+        # Page.has_next() и Page.has_previous() сравнивают number
+        # с num_pages, поэтому отдаём столько страниц, сколько известно
+        # по курсору, не считая записи.
+        number = 2 if self.has_previous else 1
+        return number + 1 if self.has_next else number
+
+    def encode(self, obj):
+        # Строки queryset.values() приходят словарями.
+        values = []
+        for name in self.fields:
+            value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+            if isinstance(value, datetime):
+                value = (value - EPOCH) // timedelta(microseconds=1)
+            values.append(str(value))
+        return '_'.join(values)
+
+    def decode(self, cursor):
+        parts = (cursor or '').split('_')
+        if len(parts) != len(self.fields):
+            return None
+        values = []
+        model = self.object_list.model
+        for name, part in zip(self.fields, parts):
+            try:
+                value = int(part)
+                if abs(value) > MAX_CURSOR_VALUE:
+                    return None
+                if isinstance(model._meta.get_field(name),
+                              models.DateTimeField):
+                    value = EPOCH + timedelta(microseconds=value)
+            except (ValueError, OverflowError):
+                return None
+            values.append(value)
+        return values
+
+    def key_filter(self, values, lookup):
+        condition = Q()
+        for i, name in enumerate(self.fields):
+            step = Q(**{f'{name}__{lookup}': values[i]})
+            for prev_name, prev_value in zip(self.fields[:i], values[:i]):
+                step &= Q(**{prev_name: prev_value})
+            condition |= step
+        return condition
+
+    def get_cursor_page(self, before=None, after=None):
+        """Возвращает страницу, начинающуюся после курсора before
+        или заканчивающуюся перед курсором after."""
+        descending = [f'-{name}' for name in self.fields]
+        ascending = list(self.fields)
+        queryset = self.object_list
+        after_key = self.decode(after)
+        before_key = self.decode(before)
+        if after_key is not None:
+            queryset = queryset.filter(
+                self.key_filter(after_key, 'gt')
+            ).order_by(*ascending)
+            items = list(queryset[:self.per_page + 1])
+            if len(items) <= self.per_page:
+                return self.get_cursor_page()
+            items = items[:self.per_page][::-1]
+            self.has_previous = self.has_next = True
+        else:
+            if before_key is not None:
+                queryset = queryset.filter(self.key_filter(before_key, 'lt'))
+                self.has_previous = True
+            items = list(queryset.order_by(*descending)[:self.per_page + 1])
+            self.has_next = len(items) > self.per_page
+            items = items[:self.per_page]
+        page = Page(items, 2 if self.has_previous else 1, self)
+        page.next_cursor = (
+            self.encode(items[-1]) if self.has_next and items else None
+        )
+        page.previous_cursor = (
+            self.encode(items[0]) if self.has_previous and items else None
+        )
+        return page
 
 
-def page_context(request, queryset):
-    paginator = Paginator(queryset, settings.POST_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+class CountedPaginator(Paginator):
+    """Paginator, берущий число записей из кэшированного счётчика ленты
+    и выводящий ссылки только на соседние страницы."""
+
+    approximate = False
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.checked_number = None
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        count, self.approximate = get_feed_count(
+            self.count_key, self.object_list
+        )
+        return count
+
+    def has_offset(self, offset):
+        return self.object_list[offset:offset + 1].exists()
+
+    def validate_number(self, number):
+        """Номер страницы, проверенный по записям, а не по оценке.
+
+        Оценочное число записей может быть меньше настоящего, поэтому
+        страница за ним ищется запросом, а число страниц продлевается
+        до следующей существующей.
+        """
+        try:
+            number = super().validate_number(number)
+        except EmptyPage:
+            number = int(number) if self.approximate else 0
+            if number < 1 or not self.has_offset(
+                (number - 1) * self.per_page
+            ):
+                raise
+        if (self.approximate and number >= self.num_pages
+                and number != self.checked_number):
+            self.checked_number = number
+            self.__dict__['num_pages'] = number + self.has_offset(
+                number * self.per_page
+            )
+        return number
+
+    def get_page(self, number):
+        try:
+            number = self.validate_number(number)
+        except PageNotAnInteger:
+            number = 1
+        except EmptyPage:
+            if self.approximate:
+                # Страница за концом ленты: последняя страница берётся
+                # из точного числа записей, а не из оценки.
+                self.__dict__['count'] = super().count
+                self.__dict__.pop('num_pages', None)
+                self.approximate = False
+            number = self.num_pages
+        return self.page(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if not self.approximate and top + self.orphans >= self.count:
+            top = self.count
+        return self._get_page(self.object_list[bottom:top], number, self)
+
+    def _get_page(self, *args, **kwargs):
+        page = super()._get_page(*args, **kwargs)
+        width = settings.PAGE_LINKS_WINDOW
+        page.window = range(
+            max(1, page.number - width),
+            min(self.num_pages, page.number + width) + 1
+        )
+        return page
+
+
+def page_context(request, queryset, count_key=None):
+    if 'page' in request.GET:
+        # Совместимость со старыми ссылками вида ?page=N.
+        paginator = CountedPaginator(
+            queryset, settings.POST_PER_PAGE, count_key=count_key
+        )
+        page_obj = paginator.get_page(request.GET.get('page'))
+    else:
+        paginator = CursorPaginator(queryset, settings.POST_PER_PAGE)
+        page_obj = paginator.get_cursor_page(
+            before=request.GET.get('before'),
+            after=request.GET.get('after')
+        )
     context = {
         'page_obj': page_obj,
     }
     return context
+
+
+def comment_page(post_id, before=None):
+    """Страница комментариев поста, от новых к старым."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    )
+    paginator = CursorPaginator(
+        comments, settings.COMMENTS_PER_PAGE, fields=('created', 'id')
+    )
+    return paginator.get_cursor_page(before=before)
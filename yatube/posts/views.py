@@ -1,46 +1,119 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
-
+from django.views.decorators.http import condition
+
+from . import search as post_search
+from . import timeline
+from .counters import get_counter
+from .counts import feed_key, reset_feed_counts
+from .etags import (group_etag, index_etag, post_author_id, post_etag,
+                    profile_etag)
+from .follows import is_following
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
-from .utils import page_context
+from .fragments import bump_generations, fragment_context
+from .models import Follow, Group, Post, User
+from .utils import comment_page, page_context
 
 
+@condition(etag_func=index_etag)
 def index(request):
-    context = page_context(request, Post.objects.all())
+    posts = Post.objects.select_related('author', 'group')
+    count_key = feed_key('global')
+    context = page_context(request, posts, count_key=count_key)
+    context.update(fragment_context(request, [count_key]))
     return render(request, 'posts/index.html', context)
 
 
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    context = page_context(request, group.posts.all())
-    context.update(group=group)
+    posts = group.posts.select_related('author', 'group')
+    count_key = feed_key('group', group.id)
+    context = page_context(request, posts, count_key=count_key)
+    context.update(fragment_context(request, [count_key]), group=group)
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=profile_etag)
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
-    context = page_context(request, user.posts.all())
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=user
-    ).exists()
-    context.update(author=user, following=following)
+    user = get_object_or_404(
+        User.objects.select_related('counter'), username=username
+    )
+    posts = user.posts.select_related('author', 'group')
+    count_key = feed_key('author', user.id)
+    context = page_context(request, posts, count_key=count_key)
+    following = is_following(request.user, user)
+    context.update(
+        fragment_context(request, [count_key], viewer=request.user == user),
+        author=user,
+        following=following,
+        counter=get_counter(user)
+    )
     return render(request, 'posts/profile.html', context)
 
 
+@condition(etag_func=post_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__counter', 'group'), id=post_id
+    )
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post=post)
     context = {
         'post': post,
         'form': form,
-        'comments': comments
+        'comments': comment_page(post.id),
+        'counter': get_counter(post.author)
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@condition(etag_func=post_etag)
+def post_comments(request, post_id):
+    # Автор поста уже в кэше после расчёта ETag: проверка без запроса.
+    if post_author_id(post_id) is None:
+        raise Http404
+    context = {
+        'post_id': post_id,
+        'comments': comment_page(post_id, before=request.GET.get('before')),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    group_slug = request.GET.get('group', '')
+    username = request.GET.get('author', '')
+    group = author = None
+    if group_slug:
+        group = get_object_or_404(Group, slug=group_slug)
+    if username:
+        author = get_object_or_404(User, username=username)
+    posts, next_cursor = post_search.search_posts(
+        query,
+        settings.POST_PER_PAGE,
+        group=group,
+        author=author,
+        after=request.GET.get('after')
+    )
+    params = request.GET.copy()
+    params.pop('after', None)
+    context = {
+        'query': query,
+        'group': group,
+        'author': author,
+        'posts': posts,
+        'next_cursor': next_cursor,
+        'params': params.urlencode(),
+        'fragment_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
@@ -63,7 +136,13 @@ def post_edit(request, post_id):
         request.POST or None, files=request.FILES or None, instance=post
     )
     if form.is_valid():
-        form.save()
+        # comments_count меняют сигналы комментариев, пока идёт правка,
+        # поэтому записываются только поля формы. Файл и ссылка на него
+        # сохраняются в одной транзакции (см. media.release).
+        with transaction.atomic():
+            form.save(commit=False).save(
+                update_fields=[*form.Meta.fields, 'updated']
+            )
         return redirect('posts:post_detail', post.id)
     context = {
         'form': form,
@@ -74,6 +153,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -87,15 +167,22 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.select_related('group').filter(
-        author__following__user=request.user
+    count_key = feed_key('follower', request.user.id)
+    if timeline.pull(request.user):
+        reset_feed_counts([count_key])
+        bump_generations([count_key])
+    entries = request.user.timeline.select_related(
+        'post__author', 'post__group'
     )
-    context = page_context(request, posts)
-    context.update(posts=posts)
+    context = page_context(request, entries, count_key=count_key)
+    page_obj = context['page_obj']
+    page_obj.object_list = [entry.post for entry in page_obj]
+    context.update(fragment_context(request, [count_key]))
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -104,6 +191,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     Follow.objects.filter(
         user=request.user, author__username=username
@@ -0,0 +1,11 @@
+// Подгрузка следующих комментариев по ссылке «Ещё» без перезагрузки.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('[data-comments-more]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  fetch(link.href)
+    .then(function (response) { return response.text(); })
+    .then(function (html) { link.parentElement.outerHTML = html; });
+});
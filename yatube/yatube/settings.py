@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     'about.apps.AboutConfig',
     'posts.apps.PostsConfig',
     'core.apps.CoreConfig',
+    'api.apps.ApiConfig',
     'users.apps.UsersConfig',
     'django.contrib.admin',
     'django.contrib.auth',
@@ -29,32 +30,53 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
     'sorl.thumbnail',
 ]
 
+# Память процесса и общий для процессов файл SQLite. Изменения
+# из других процессов видны в памяти через LOCAL_TIMEOUT секунд,
+# просроченное значение отдаётся ещё STALE_TIMEOUT секунд, пока
+# один из читателей его пересчитывает.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'default.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'LOCAL_MAX_ENTRIES': 5000,
+            'LOCAL_TIMEOUT': 1,
+            'STALE_TIMEOUT': 60,
+            'LOCK_TIMEOUT': 10,
+        },
     }
 }
 
+# Тесты получают свои файлы кэшей на каждый запуск.
+TEST_RUNNER = 'core.testing.DiscoverRunner'
+
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.TemplateProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'posts.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'posts.middleware.HolePunchPageCacheMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.DjangoTemplates',
         'DIRS': [TEMPLATE_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -73,8 +95,24 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # sqlite3 с PRAGMA и режимом транзакций из OPTIONS.
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами одного потока.
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            # WAL позволяет читать ленты, пока пишутся комментарии
+            # и подписки, а busy_timeout ждёт освобождения записи.
+            'pragmas': {
+                'journal_mode': 'wal',
+                'synchronous': 'normal',
+                'busy_timeout': 5000,
+                'cache_size': -64000,
+                'mmap_size': 256 * 1024 * 1024,
+                'temp_store': 'memory',
+            },
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
@@ -116,8 +154,52 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 POST_PER_PAGE = 10
 
+COMMENTS_PER_PAGE = 20
+
+PAGE_LINKS_WINDOW = 2
+
+FEED_COUNT_MAX_AGE = 300
+
+FEED_COUNT_LIMIT = 1000
+
+TIMELINE_FANOUT_LIMIT = 1000
+
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+# Больший оригинал уменьшается при загрузке.
+IMAGE_MAX_SIZE = (2560, 2560)
+
+# Сжатые копии миниатюр; форматы, которые не умеет кодировать
+# установленный Pillow, пропускаются.
+IMAGE_VARIANTS = {
+    'avif': {'quality': 50},
+    'webp': {'quality': 80, 'method': 6},
+}
+
+# Сколько секунд клиент API может не перепроверять ответ по ETag.
+API_MAX_AGE = 30
+
+API_MAX_LIMIT = 100
+
+FOLLOW_BATCH_LIMIT = 500
+
+THUMBNAIL_WORKERS = 2
+
+THUMBNAIL_RETRY_AFTER = 60
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 INTERNAL_IPS = [
     '127.0.0.1',
 ] 
+
+METRICS_ALLOWED_IPS = INTERNAL_IPS
+
+# Профилирование шаблонов по ?profile=json|folded с METRICS_ALLOWED_IPS.
+TEMPLATE_PROFILING = False